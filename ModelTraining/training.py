@@ -16,8 +16,11 @@ META_DATASET_PATH = ""  # Input the path to the IBM CodeNet Metadata
 MODEL_PATH = ""         # Where to store the trained model
 TRAINING_LOG = ""       # Where to store the model checkpoints
 LOGGING_DIR = ""        # Where to store the training logs
+TEST_SPLIT_PATH = ""    # Where to store the held-out test split, as JSON lines
+NORMALISE = False       # Train on code normalised as with -normalise
 TRAIN_PARAM = 0.8
 TEST_PARAM = 0.2
+SPLIT_SEED = 42
 meta_df = pd.read_csv(META_DATASET_PATH)
 PER_DEVICE_BATCH_SIZE = 64
 
@@ -26,19 +29,29 @@ tokenizer = AutoTokenizer.from_pretrained(model_name)
 model = AutoModelForSequenceClassification.from_pretrained(model_name)
 
 lang_to_ext = {"Java": "java", "Python": "py", "JavaScript": "js"}
+normaliser = None
+if NORMALISE:
+    # Requires the tool's package, e.g. pip install -e ../ToolSource.
+    # The model must then be used with the classifier's -normalise flag.
+    from aioptim.utils.normaliser import Normaliser
+    normaliser = Normaliser()
 combined_metrics = evaluate.combine(["accuracy", "f1", "precision", "recall"])
 
 files_processed = 0
+characters_read = 0
+characters_kept = 0
 
 
 def dataset_gen():
     """
     Generates the dataset based on CodeNet annotated data.
+    With NORMALISE, code is normalised as the classifier normalises it
+    with -normalise.
 
     Yields:
         Code and associated annotation.
     """
-    global files_processed
+    global files_processed, characters_read, characters_kept
     for _, row in meta_df.iterrows():
         try:
             # Extract data from the CodeNet folder to feed into the model
@@ -51,6 +64,12 @@ def dataset_gen():
             code = ""
             with open(path) as f:
                 code = f.read()
+            characters_read += len(code)
+            if normaliser:
+                code = normaliser.normalise(
+                    code, lang_to_ext[row["Lang"]]
+                ).code
+            characters_kept += len(code)
             files_processed += 1
             yield {"code": code, "label": row["Label"]}
         except Exception as e:
@@ -89,8 +108,12 @@ def tokenize_function(row):
 dataset = Dataset.from_generator(dataset_gen, keep_in_memory=True)
 dataset = dataset.map(tokenize_function, batched=True, keep_in_memory=True)
 dataset = dataset.train_test_split(
-    test_size=TEST_PARAM, train_size=TRAIN_PARAM, shuffle=True, keep_in_memory=True
+    test_size=TEST_PARAM, train_size=TRAIN_PARAM, shuffle=True, keep_in_memory=True,
+    seed=SPLIT_SEED
 )
+if TEST_SPLIT_PATH:
+    # Held out for checking inference backends against labelled code
+    dataset["test"].select_columns(["code", "label"]).to_json(TEST_SPLIT_PATH)
 
 training_arguments = TrainingArguments(
     output_dir=TRAINING_LOG,
@@ -118,4 +141,8 @@ trainer.train()                                                 # Start training
 trainer.save_model(MODEL_PATH)                                  # Save Model
 evaluation_results = trainer.evaluate()                         # Evaluate the model
 print(f"Evaluation Results: \n {evaluation_results}")
-print(f"Files processed: {files_processed}/{len(meta_df)}")
\ No newline at end of file
+print(f"Files processed: {files_processed}/{len(meta_df)}")
+if normaliser:
+    print(
+        f"Characters kept by normalisation: {characters_kept}/{characters_read}"
+    )
\ No newline at end of file
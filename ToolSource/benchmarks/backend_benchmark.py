@@ -0,0 +1,129 @@
+"""
+Benchmarks the classifier's inference backends on CPU.
+
+Each backend classifies the held-out test split that
+ModelTraining/training.py writes to TEST_SPLIT_PATH, as JSON lines of
+labelled code. The label accuracy of each backend is reported, with its
+agreement with the float32 reference and the largest logit difference,
+then the backend is timed on the same sample for throughput and
+per-batch latency.
+
+    python benchmarks/backend_benchmark.py test_split.jsonl \
+        --backends torch int8 onnx
+"""
+from aioptim.services.backends import parity
+from aioptim.services.classifier import Classifier
+from types import SimpleNamespace
+import argparse
+import json
+import statistics
+import time
+
+
+def held_out(path, count):
+    """
+    Reads labelled methods from the held-out test split.
+
+    Args:
+        path: The JSON lines file of code and label records
+        count: The maximum number of methods to read
+
+    Returns:
+        List of methods, and list of their labels
+    """
+    methods, labels = [], []
+    with open(path) as file:
+        for line in file:
+            if len(methods) == count:
+                break
+            record = json.loads(line)
+            methods.append(SimpleNamespace(method=record["code"]))
+            labels.append(record["label"])
+    return methods, labels
+
+
+def batches(classifier, methods):
+    """
+    Tokenises methods into the padded batches fed to the backends.
+
+    Args:
+        classifier: The classifier holding the tokenizer
+        methods: The methods to tokenise
+
+    Returns:
+        List of (input IDs, attention mask) batches
+    """
+    chunks = [
+        classifier.tokenise(method)[0][:Classifier.TOKEN_MAX]
+        for method in methods
+    ]
+    return [
+        tuple(classifier._batch(chunks[i:i+classifier.batch_size]).values())
+        for i in range(0, len(chunks), classifier.batch_size)
+    ]
+
+
+def benchmark(path, count, backends, batch_size, snapshot, normalise):
+    """
+    Compares the backends on the held-out test split.
+
+    Args:
+        path: The JSON lines file of the held-out test split
+        count: The maximum number of methods to classify
+        backends: The backends to compare
+        batch_size: The number of chunks per batch
+        snapshot: A local model snapshot directory
+        normalise: Whether the model was trained on normalised code
+    """
+    methods, labels = held_out(path, count)
+    options = {
+        "batch_size": batch_size, "snapshot": snapshot, "normalise": normalise
+    }
+    reference = Classifier(**options)
+    sample = batches(reference, methods)
+    for name in backends:
+        candidate = Classifier(backend=name, **options)
+        accuracy = sum(
+            label.value == expected
+            for (label, _), expected in zip(
+                candidate.classify(methods), labels
+            )
+        ) / len(labels)
+        agreement, difference = parity(
+            reference.backend, candidate.backend, sample
+        )
+        latencies = []
+        for input_ids, attention_mask in sample:
+            start = time.perf_counter()
+            candidate.backend(input_ids, attention_mask)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(
+            f"backend={name:<6} accuracy={accuracy:.3f} "
+            f"agreement={agreement:.3f} "
+            f"max_logit_diff={difference:.4f} "
+            f"throughput={len(methods) / sum(latencies):.1f} methods/s "
+            f"p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"p95={latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument("test_split")
+    arguments.add_argument("--methods", type=int, default=1000)
+    arguments.add_argument("--batch", type=int, default=16)
+    arguments.add_argument("--snapshot")
+    arguments.add_argument("--normalise", action="store_true")
+    arguments.add_argument(
+        "--backends", nargs="+", default=["torch", "int8", "onnx"]
+    )
+    options = arguments.parse_args()
+    benchmark(
+        options.test_split,
+        options.methods,
+        options.backends,
+        options.batch,
+        options.snapshot,
+        options.normalise
+    )
@@ -0,0 +1,133 @@
+"""
+Benchmarks syntax-aware chunking against fixed token windows.
+
+Methods are taken from Python and Java sources on disk, by default this
+repository. Both splitters are compared on their chunk counts and on
+where they cut: at a top-level statement, at a nested statement, or in
+the middle of a statement. With --classify, the methods are classified
+under both splitters, to compare the slow methods passed on to the
+generator and the LLM calls they cost.
+
+    python benchmarks/chunking_benchmark.py ../ --limit 128 --classify
+"""
+from aioptim.services.classifier import Classifier
+from aioptim.services.parser import JavaParser, PythonParser
+from aioptim.utils.node import Node
+from pathlib import Path
+from types import SimpleNamespace
+import argparse
+import base64
+
+PARSERS = {".py": PythonParser(), ".java": JavaParser()}
+# Each generation run describes, generates and validates the method
+LLM_CALLS_PER_RUN = 3
+
+
+def repository_nodes(roots):
+    """
+    Parses the method nodes of the source files under the given directories.
+
+    Args:
+        roots: The directories to search
+
+    Returns:
+        List of method nodes
+    """
+    nodes = []
+    for root in roots:
+        for path in sorted(Path(root).rglob("*")):
+            if path.suffix not in PARSERS or not path.is_file():
+                continue
+            file = Node.FileNode(SimpleNamespace(
+                path=str(path),
+                content=base64.b64encode(path.read_bytes())
+            ))
+            PARSERS[path.suffix].parse_file_methods(file)
+            nodes.extend(file.methods.values())
+    return nodes
+
+
+def cut_kinds(nodes, classifier, syntax):
+    """
+    Chunks methods and counts the chunks and the kinds of cuts.
+
+    Args:
+        nodes: The method nodes to chunk
+        classifier: The classifier holding the tokenizer
+        syntax: Whether to cut on statement boundaries
+
+    Returns:
+        Dictionary of counts
+    """
+    counts = dict.fromkeys(
+        ["chunks", "split_methods", "statement", "nested", "mid"], 0
+    )
+    for node in nodes:
+        encoded, cuts = classifier.tokenise(node)
+        chunks = Classifier.split(
+            len(encoded),
+            cuts if syntax else {},
+            Classifier.TOKEN_MAX,
+            classifier.overlap
+        )
+        counts["chunks"] += len(chunks)
+        counts["split_methods"] += len(chunks) > 1
+        for _, end in chunks[:-1]:
+            depth = cuts.get(end)
+            counts[
+                "mid" if depth is None else "nested" if depth else "statement"
+            ] += 1
+    return counts
+
+
+def benchmark(roots, snapshot, limit, overlap, classify):
+    """
+    Compares fixed windows and syntax-aware chunking.
+
+    Args:
+        roots: The directories to take methods from
+        snapshot: A local model snapshot, defaults to the hub model
+        limit: The maximum tokens per chunk
+        overlap: The tokens a syntax-aware chunk repeats
+        classify: Whether to classify the methods under both splitters
+    """
+    Classifier.TOKEN_MAX = limit
+    nodes = repository_nodes(roots)
+    print(f"methods={len(nodes)} limit={limit} overlap={overlap}")
+    splitters = {
+        "fixed": (Classifier(snapshot=snapshot), False),
+        "syntax": (Classifier(snapshot=snapshot, overlap=overlap), True)
+    }
+    for name, (classifier, syntax) in splitters.items():
+        counts = cut_kinds(nodes, classifier, syntax)
+        line = f"splitter={name:<7} " + " ".join(
+            f"{key}={value}" for key, value in counts.items()
+        )
+        if classify:
+            slow = len(classifier(*(
+                nodes if syntax else
+                [SimpleNamespace(method=node.method) for node in nodes]
+            )))
+            line += (
+                f" slow={slow} llm_calls>={slow * LLM_CALLS_PER_RUN}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument(
+        "roots", nargs="*", default=[str(Path(__file__).parents[2])]
+    )
+    arguments.add_argument("--snapshot", default=None)
+    arguments.add_argument("--limit", type=int, default=Classifier.TOKEN_MAX)
+    arguments.add_argument("--overlap", type=int, default=0)
+    arguments.add_argument("--classify", action="store_true")
+    options = arguments.parse_args()
+    benchmark(
+        options.roots,
+        options.snapshot,
+        options.limit,
+        options.overlap,
+        options.classify
+    )
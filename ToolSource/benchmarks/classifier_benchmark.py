@@ -0,0 +1,79 @@
+"""
+Benchmarks classification of many methods for increasing batch sizes.
+
+Every chunk of every method is classified in one batched run, so larger
+batches trade padding for fewer forward passes.
+
+    python benchmarks/classifier_benchmark.py --methods 500 --batch 1 8 32
+"""
+from aioptim.services.classifier import Classifier
+from types import SimpleNamespace
+import argparse
+import random
+import time
+
+STATEMENTS = [
+    "total += compute(value)",
+    "items = [item for item in items if item]",
+    "result = session.query(Model).filter(Model.id == key).all()",
+    "for value in values:\n        total += value",
+    "if key in cache:\n        return cache[key]",
+    "data = requests.get(url).json()",
+]
+
+
+def synthetic_methods(count, seed=0):
+    """
+    Creates method-like nodes of varying length.
+
+    Args:
+        count: The number of methods to generate
+        seed: The random seed
+
+    Returns:
+        List of nodes holding the method source code
+    """
+    generator = random.Random(seed)
+    methods = []
+    for index in range(count):
+        body = "\n    ".join(
+            generator.choice(STATEMENTS)
+            for _ in range(generator.randint(2, 120))
+        )
+        methods.append(
+            SimpleNamespace(method=f"def method{index}(values):\n    {body}")
+        )
+    return methods
+
+
+def benchmark(count, batch_sizes, snapshot):
+    """
+    Times classification of the synthetic methods for each batch size.
+
+    Args:
+        count: The number of methods to classify
+        batch_sizes: The batch sizes to compare
+        snapshot: A local model snapshot directory
+    """
+    methods = synthetic_methods(count)
+    classifier = Classifier(snapshot=snapshot)
+    baseline = None
+    for batch_size in batch_sizes:
+        classifier.batch_size = batch_size
+        start = time.perf_counter()
+        slow = classifier(*methods)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(
+            f"batch={batch_size:<4} methods={count:<5} slow={len(slow):<5} "
+            f"time={elapsed:.2f}s speedup={baseline / elapsed:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument("--methods", type=int, default=500)
+    arguments.add_argument("--batch", type=int, nargs="+", default=[1, 8, 32])
+    arguments.add_argument("--snapshot")
+    options = arguments.parse_args()
+    benchmark(options.methods, options.batch, options.snapshot)
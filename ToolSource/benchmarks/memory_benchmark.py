@@ -0,0 +1,203 @@
+"""
+Benchmarks the memory held by the method nodes of a Java repository.
+
+The slotted method nodes, which keep byte ranges into their file's
+buffer, are compared with the dataclass nodes they replaced, which held
+copies of the method, parameter and decorator text next to the file's
+decoded source. Both are built from the same extracted methods, so the
+difference is the cost of the representation alone.
+
+    python benchmarks/memory_benchmark.py --repository path/to/java/repo
+    python benchmarks/memory_benchmark.py --files 3000 --methods 10
+"""
+from aioptim.services.parser import BaseParser, JavaParser
+from aioptim.utils.node import Node
+from dataclasses import dataclass, field
+from parser_benchmark import synthetic_repository
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Union
+import argparse
+import base64
+import tracemalloc
+
+
+@dataclass
+class DataclassMethodNode:
+    """
+    Method node holding copies of its text, as before byte ranges.
+    """
+    parent: object
+    id: str
+    params: str
+    method: str
+    decorator: Union[str, None] = None
+    cls: Union[str, None] = None
+    calls: tuple = ()
+    profile: tuple = ()
+    statements: tuple = ()
+    probability: Union[float, None] = None
+    region: Union[tuple, None] = None
+    generated_code: Union[str, None] = None
+    symbol: int = field(init=False)
+
+    def __post_init__(self):
+        self.symbol = Node.SYMBOLS.intern(
+            (self.parent.base.path, self.cls, self.id, self.params)
+        )
+
+
+class DataclassFileNode:
+    """
+    File node holding its decoded source, as before byte ranges.
+    """
+
+    def __init__(self, base_file):
+        self.base = base_file
+        self.raw_code = base64.b64decode(base_file.content).decode()
+        self.methods = {}
+        self.named = {}
+        self.links = []
+        self.imports = []
+        self.package = None
+        self.routes = []
+
+
+def repository(path):
+    """
+    Reads the Java files of a local repository.
+
+    Args:
+        path: The repository's root directory
+
+    Returns:
+        List of GitHub-like files, with base64-encoded contents
+    """
+    root = Path(path)
+    return [
+        SimpleNamespace(
+            path=str(file.relative_to(root)),
+            content=base64.b64encode(file.read_bytes())
+        )
+        for file in sorted(root.rglob("*.java"))
+    ]
+
+
+def dataclass_nodes(bases, extracts):
+    """
+    Builds the dataclass file and method nodes.
+
+    Args:
+        bases: The GitHub-like files
+        extracts: The methods extracted from each file
+
+    Returns:
+        List of file nodes
+    """
+    files = []
+    for base, extract in zip(bases, extracts):
+        file = DataclassFileNode(base)
+        buffer = base64.b64decode(base.content)
+
+        def text(span):
+            return buffer[span[0]:span[1]].decode()
+
+        for record in extract.methods:
+            method = DataclassMethodNode(
+                parent=file,
+                id=record.identifier,
+                params=text(record.parameters),
+                method=text(record.span),
+                decorator=(
+                    text(record.decorator) if record.decorator else None
+                ),
+                cls=record.cls,
+                calls=record.calls,
+                profile=Node.FileNode.MethodNode.Profile(*record.profile),
+                statements=record.statements
+            )
+            file.methods[method.symbol] = method
+            file.named.setdefault(method.id, []).append(method)
+        file.imports = extract.imports
+        file.package = extract.package
+        file.routes = extract.routes
+        files.append(file)
+    return files
+
+
+def slotted_nodes(bases, extracts):
+    """
+    Builds the slotted file and method nodes.
+
+    Args:
+        bases: The GitHub-like files
+        extracts: The methods extracted from each file
+
+    Returns:
+        List of file nodes
+    """
+    files = []
+    for base, extract in zip(bases, extracts):
+        file = Node.FileNode(base)
+        BaseParser._merge(file, extract)
+        files.append(file)
+    return files
+
+
+def traced(build, bases, extracts):
+    """
+    Measures the memory held by the nodes a builder returns.
+
+    Args:
+        build: The node builder
+        bases: The GitHub-like files
+        extracts: The methods extracted from each file
+
+    Returns:
+        The built file nodes, and the bytes they hold
+    """
+    tracemalloc.start()
+    files = build(bases, extracts)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return files, held
+
+
+def benchmark(bases):
+    """
+    Compares the memory of both representations on the same files.
+
+    Args:
+        bases: The GitHub-like files of the repository
+    """
+    parser = JavaParser()
+    extracts = [
+        parser.extract(base64.b64decode(base.content)) for base in bases
+    ]
+    # Interns every symbol up front, so neither side pays for the table
+    slotted_nodes(bases, extracts)
+    baseline, before = traced(dataclass_nodes, bases, extracts)
+    methods = sum(len(file.methods) for file in baseline)
+    del baseline
+    _, after = traced(slotted_nodes, bases, extracts)
+    print(
+        f"files={len(bases):<6} methods={methods:<7} "
+        f"dataclass={before / 2 ** 20:.1f}MiB "
+        f"slotted={after / 2 ** 20:.1f}MiB "
+        f"saving={1 - after / before:.0%}"
+    )
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument("--repository")
+    arguments.add_argument("--files", type=int, default=3000)
+    arguments.add_argument("--methods", type=int, default=10)
+    options = arguments.parse_args()
+    if options.repository:
+        benchmark(repository(options.repository))
+    else:
+        benchmark([
+            file.base
+            for file in synthetic_repository(options.files, options.methods)
+        ])
@@ -0,0 +1,110 @@
+"""
+Benchmarks the cold start and memory of classifier processes.
+
+Several processes load and warm the classifier at once, then report
+their load time, resident set size (RSS) and proportional set size
+(PSS). PSS splits shared pages between the processes sharing them, so
+it shows the memory each additional process really costs. PSS is read
+from /proc and only reported on Linux.
+
+Each process either loads the model from the snapshot itself, relying
+on from_pretrained to map safetensors weights, or receives the model
+loaded once and moved to shared memory, as the classifier's worker
+pool does.
+
+    python benchmarks/mmap_benchmark.py --snapshot model/ --processes 4
+"""
+from aioptim.services.classifier import Classifier
+import argparse
+import os
+import statistics
+import time
+import torch.multiprocessing as mp
+
+
+def memory():
+    """
+    Reads the memory of the current process.
+
+    Returns:
+        The RSS and PSS in MiB, PSS is None where it is not available
+    """
+    sizes = {}
+    for path in ("/proc/self/smaps_rollup", "/proc/self/status"):
+        if os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    key, _, value = line.partition(":")
+                    if key in ("Pss", "VmRSS"):
+                        sizes[key] = int(value.split()[0]) / 1024
+    if "VmRSS" not in sizes:
+        import resource
+        sizes["VmRSS"] = (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        )
+    return sizes["VmRSS"], sizes.get("Pss")
+
+
+def run(snapshot, model, barrier, results):
+    """
+    Loads and warms a classifier, then reports once every process has.
+
+    Args:
+        snapshot: A local model snapshot, defaults to the hub model
+        model: The shared model, or None to load it in the process
+        barrier: Synchronises the processes before measuring memory
+        results: The queue of (seconds, RSS, PSS) results
+    """
+    start = time.perf_counter()
+    Classifier(snapshot=snapshot).load(model)
+    seconds = time.perf_counter() - start
+    barrier.wait()
+    results.put((seconds, *memory()))
+    barrier.wait()
+
+
+def benchmark(snapshot, processes):
+    """
+    Compares loading the model in each process with sharing one copy.
+
+    Args:
+        snapshot: A local model snapshot, defaults to the hub model
+        processes: The number of processes loading the classifier
+    """
+    context = mp.get_context("spawn")
+    for shared in (False, True):
+        model = (
+            Classifier(snapshot=snapshot).pretrained().share_memory()
+            if shared else None
+        )
+        barrier = context.Barrier(processes)
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=run, args=(snapshot, model, barrier, results)
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        measured = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        seconds, rss, pss = zip(*measured)
+        line = (
+            f"model={'shared' if shared else 'loaded':<6} "
+            f"processes={processes} "
+            f"load_seconds={statistics.mean(seconds):.2f} "
+            f"rss_mib={statistics.mean(rss):.0f}"
+        )
+        if None not in pss:
+            line += f" pss_mib={statistics.mean(pss):.0f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument("--snapshot", default=None)
+    arguments.add_argument("--processes", type=int, default=4)
+    options = arguments.parse_args()
+    benchmark(options.snapshot, options.processes)
@@ -0,0 +1,62 @@
+"""
+Benchmarks the token reduction of normalising methods before they are
+classified.
+
+Methods are taken from Python and Java sources on disk, by default this
+repository, and tokenised as written and as normalised. The reduction
+in tokens and in classifier chunks is reported per method.
+
+    python benchmarks/normalisation_benchmark.py ../ --snapshot model/
+"""
+from aioptim.services.classifier import Classifier
+from aioptim.utils.normaliser import Normaliser
+from chunking_benchmark import repository_nodes
+from pathlib import Path
+import argparse
+import math
+import statistics
+
+
+def benchmark(roots, snapshot):
+    """
+    Compares the tokens and chunks of raw and normalised methods.
+
+    Args:
+        roots: The directories to take methods from
+        snapshot: A local model snapshot, defaults to the hub model
+    """
+    tokenizer = Classifier(snapshot=snapshot).tokenizer
+    normaliser = Normaliser()
+    reductions, chunks = [], [0, 0]
+    for node in repository_nodes(roots):
+        counts = [
+            len(tokenizer.encode(
+                code, add_special_tokens=False, verbose=False
+            ))
+            for code in (
+                node.method,
+                normaliser.normalise(node.method, node.language).code
+            )
+        ]
+        reductions.append(1 - counts[1] / max(counts[0], 1))
+        for i, count in enumerate(counts):
+            chunks[i] += max(math.ceil(count / Classifier.TOKEN_MAX), 1)
+    reductions.sort()
+    print(
+        f"methods={len(reductions)} "
+        f"mean_reduction={statistics.mean(reductions):.3f} "
+        f"median_reduction={statistics.median(reductions):.3f} "
+        f"p90_reduction={reductions[int(len(reductions) * 0.9)]:.3f} "
+        f"max_reduction={reductions[-1]:.3f} "
+        f"chunks={chunks[0]} normalised_chunks={chunks[1]}"
+    )
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument(
+        "roots", nargs="*", default=[str(Path(__file__).parents[2])]
+    )
+    arguments.add_argument("--snapshot", default=None)
+    options = arguments.parse_args()
+    benchmark(options.roots, options.snapshot)
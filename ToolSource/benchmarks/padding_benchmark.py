@@ -0,0 +1,94 @@
+"""
+Benchmarks padding of classifier batches on real method lengths.
+
+Methods are taken from Python and Java sources on disk, by default this
+repository, and chunked as the classifier does. Batching in the order
+methods arrive is compared with batching chunks of similar length.
+
+    python benchmarks/padding_benchmark.py ../ --batch 8 32 --time \
+        --snapshot path/to/model
+"""
+from aioptim.services.classifier import Classifier
+from chunking_benchmark import repository_nodes
+from pathlib import Path
+import argparse
+import time
+
+
+def efficiency(chunks, batches):
+    """
+    Computes the share of real tokens in padded batches.
+
+    Args:
+        chunks: The token IDs of the chunks
+        batches: The batches of chunk indices
+
+    Returns:
+        Real tokens over padded tokens
+    """
+    padded = sum(
+        len(batch) * max(len(chunks[i]) for i in batch) for batch in batches
+    )
+    return sum(map(len, chunks)) / padded
+
+
+def benchmark(roots, batch_sizes, timed, snapshot):
+    """
+    Compares arrival-order and length-bucketed batching.
+
+    Args:
+        roots: The directories to take methods from
+        batch_sizes: The batch sizes to compare
+        timed: Whether to time inference of the batches
+        snapshot: A local model snapshot directory
+    """
+    classifier = Classifier(snapshot=snapshot)
+    methods = [node.method for node in repository_nodes(roots)]
+    chunks = []
+    for method in methods:
+        encoded = classifier.tokenizer.encode(
+            method, add_special_tokens=False, verbose=False
+        )
+        chunks.extend(
+            encoded[i:i+Classifier.TOKEN_MAX]
+            for i in range(0, max(len(encoded), 1), Classifier.TOKEN_MAX)
+        )
+    lengths = sorted(map(len, chunks))
+    print(
+        f"methods={len(methods)} chunks={len(chunks)} "
+        f"median_tokens={lengths[len(lengths) // 2]} "
+        f"max_tokens={lengths[-1]}"
+    )
+    for batch_size in batch_sizes:
+        strategies = {
+            "arrival": [
+                list(range(i, min(i + batch_size, len(chunks))))
+                for i in range(0, len(chunks), batch_size)
+            ],
+            "bucketed": Classifier.buckets(chunks, batch_size)
+        }
+        for name, batches in strategies.items():
+            line = (
+                f"batch={batch_size:<4} strategy={name:<9} "
+                f"efficiency={efficiency(chunks, batches):.3f}"
+            )
+            if timed:
+                start = time.perf_counter()
+                for batch in batches:
+                    classifier.backend(
+                        **classifier._batch([chunks[i] for i in batch])
+                    )
+                line += f" time={time.perf_counter() - start:.2f}s"
+            print(line)
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument(
+        "roots", nargs="*", default=[str(Path(__file__).parents[2])]
+    )
+    arguments.add_argument("--batch", type=int, nargs="+", default=[8, 32])
+    arguments.add_argument("--time", action="store_true")
+    arguments.add_argument("--snapshot")
+    options = arguments.parse_args()
+    benchmark(options.roots, options.batch, options.time, options.snapshot)
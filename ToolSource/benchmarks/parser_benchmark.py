@@ -0,0 +1,102 @@
+"""
+Benchmarks repository indexing on a large synthetic Java repository.
+
+Compares parsing file by file against the worker pool used by
+BaseParser.parse_files, for an increasing number of workers.
+
+    python benchmarks/parser_benchmark.py --files 3000 --workers 1 4 16
+"""
+from aioptim.services.parser import JavaParser
+from aioptim.utils.node import Node
+from types import SimpleNamespace
+import argparse
+import base64
+import time
+
+CLASS_TEMPLATE = """
+package com.bench.module{package};
+
+import com.bench.module{other}.Service{other};
+
+public class Service{index} {{
+    @GetMapping("/service/{index}/{{id}}")
+    public String handle(String id) {{
+        int total = 0;
+        for (int i = 0; i < 100; i++) {{
+            total += compute(i);
+        }}
+        return lookup(id) + total;
+    }}
+{methods}
+}}
+"""
+
+METHOD_TEMPLATE = """
+    public int compute{index}(int value) {{
+        if (value % 2 == 0) {{
+            return helper(value) * {index};
+        }}
+        return value + {index};
+    }}
+"""
+
+
+def synthetic_repository(size, methods):
+    """
+    Creates file nodes for a synthetic Spring service.
+
+    Args:
+        size: The number of classes to generate
+        methods: The number of additional methods per class
+
+    Returns:
+        List of file nodes
+    """
+    files = []
+    for index in range(size):
+        code = CLASS_TEMPLATE.format(
+            package=index % 50,
+            other=(index + 1) % 50,
+            index=index,
+            methods="".join(
+                METHOD_TEMPLATE.format(index=m) for m in range(methods)
+            )
+        )
+        files.append(Node.FileNode(SimpleNamespace(
+            path=f"src/main/java/com/bench/module{index % 50}/"
+                 f"Service{index}.java",
+            content=base64.b64encode(code.encode())
+        )))
+    return files
+
+
+def benchmark(size, methods, workers):
+    """
+    Times parsing of the synthetic repository for each worker count.
+
+    Args:
+        size: The number of classes to generate
+        methods: The number of additional methods per class
+        workers: The worker counts to compare
+    """
+    parser = JavaParser()
+    baseline = None
+    for count in workers:
+        files = synthetic_repository(size, methods)
+        start = time.perf_counter()
+        parser.parse_files(files, workers=count)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(
+            f"workers={count:<3} files={size:<6} "
+            f"time={elapsed:.2f}s speedup={baseline / elapsed:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument("--files", type=int, default=3000)
+    arguments.add_argument("--methods", type=int, default=10)
+    arguments.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    options = arguments.parse_args()
+    benchmark(options.files, options.methods, options.workers)
@@ -0,0 +1,96 @@
+"""
+Benchmarks the prompt size of regenerating localised slow regions
+against regenerating whole methods.
+
+Methods are taken from Python and Java sources on disk, by default this
+repository, and their slow regions localised by the classifier. The
+code generation and description prompts of each method are built both
+ways and measured in tokens of the classifier's tokenizer.
+
+    python benchmarks/region_benchmark.py ../ --snapshot model/
+"""
+from aioptim.services.classifier import Classifier
+from aioptim.services.generator import Generator
+from aioptim.utils.config import Prompt
+from chunking_benchmark import repository_nodes
+from pathlib import Path
+import argparse
+import statistics
+
+
+def prompts(node, region):
+    """
+    Builds the prompts sent to the generator for a method.
+
+    Args:
+        node: The method node
+        region: The localised slow region, or None for the whole method
+
+    Returns:
+        The description and code generation prompts
+    """
+    templates = Prompt.get_contents()
+    keys = Prompt.PromptKeys
+    code = node.method
+    if region:
+        code = code[region[0]:region[1]]
+        generation = Generator._replace(templates[keys.REGION_GEN.value], {
+            "$CODE$": code,
+            "$CONTEXT$": node.context(*region),
+            "$LANGUAGE$": node.language
+        })
+    else:
+        generation = Generator._replace(templates[keys.CODE_GEN.value], {
+            "$CODE$": code,
+            "$SIGNATURE$": node.id,
+            "$LANGUAGE$": node.language
+        })
+    description = Generator._replace(templates[keys.DES_GEN.value], {
+        "$CODE$": code,
+        "$LANGUAGE$": node.language
+    })
+    return description, generation
+
+
+def benchmark(roots, snapshot, share):
+    """
+    Compares the prompt tokens of whole methods and localised regions.
+
+    Args:
+        roots: The directories to take methods from
+        snapshot: A local model snapshot, defaults to the hub model
+        share: The share of a method's attribution its region must hold
+    """
+    classifier = Classifier(snapshot=snapshot)
+
+    def tokens(texts):
+        return sum(
+            len(classifier.tokenizer.encode(
+                text, add_special_tokens=False, verbose=False
+            ))
+            for text in texts
+        )
+
+    whole, regional, localised = [], [], 0
+    for node in repository_nodes(roots):
+        region = classifier.localise(node, share)
+        localised += region is not None
+        whole.append(tokens(prompts(node, None)))
+        regional.append(tokens(prompts(node, region)))
+    print(
+        f"methods={len(whole)} localised={localised} "
+        f"mean_whole_tokens={statistics.mean(whole):.0f} "
+        f"mean_region_tokens={statistics.mean(regional):.0f} "
+        f"reduction={1 - sum(regional) / sum(whole):.3f}"
+    )
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument(
+        "roots", nargs="*", default=[str(Path(__file__).parents[2])]
+    )
+    arguments.add_argument("--snapshot", default=None)
+    arguments.add_argument("--share", type=float, default=0.5)
+    options = arguments.parse_args()
+    benchmark(options.roots, options.snapshot, options.share)
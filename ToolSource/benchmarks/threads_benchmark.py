@@ -0,0 +1,102 @@
+"""
+Benchmarks classifier inference for increasing intra-op thread counts.
+
+The model is loaded once and shared by a classifier per thread count.
+Methods are chunked once, then every chunk is classified under each
+setting, reporting chunks per second and the per-batch latency. Pin the
+benchmark with --cpus to measure a given share of the instance's cores.
+
+    python benchmarks/threads_benchmark.py --threads 1 2 4 8 --cpus 0 1 2 3
+"""
+from aioptim.services.classifier import Classifier
+from classifier_benchmark import synthetic_methods
+import argparse
+import statistics
+import time
+
+
+def chunks(classifier, methods):
+    """
+    Tokenises and splits methods into the chunks the classifier scores.
+
+    Args:
+        classifier: The classifier holding the tokenizer
+        methods: The methods to chunk
+
+    Returns:
+        List of chunk token IDs
+    """
+    chunked = []
+    for method in methods:
+        encoded, cuts = classifier.tokenise(method)
+        chunked.extend(
+            encoded[start:end] for start, end in Classifier.split(
+                len(encoded), cuts, Classifier.TOKEN_MAX
+            )
+        )
+    return chunked
+
+
+def benchmark(count, threads, cpus, batch_size, snapshot, repeats):
+    """
+    Times inference over the same chunks for each thread count.
+
+    Args:
+        count: The number of methods to classify
+        threads: The intra-op thread counts to compare
+        cpus: The CPUs the benchmark is pinned to, if any
+        batch_size: The number of chunks per batch
+        snapshot: A local model snapshot directory
+        repeats: The number of timed passes per thread count
+    """
+    reference = Classifier(
+        batch_size=batch_size, snapshot=snapshot, affinity=cpus
+    )
+    sample = chunks(reference, synthetic_methods(count))
+    batches = [
+        [sample[i] for i in batch]
+        for batch in Classifier.buckets(sample, batch_size)
+    ]
+    for thread_count in threads:
+        classifier = Classifier(
+            batch_size=batch_size,
+            snapshot=snapshot,
+            threads=thread_count,
+            affinity=cpus
+        )
+        classifier.load(reference.model)
+        latencies = []
+        for _ in range(repeats):
+            for batch in batches:
+                start = time.perf_counter()
+                classifier.predict(batch)
+                latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(
+            f"threads={classifier.report()['threads']:<3} "
+            f"chunks={len(sample)} "
+            f"throughput={repeats * len(sample) / sum(latencies):.1f} "
+            f"chunks/s "
+            f"p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"p95={latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument("--methods", type=int, default=256)
+    arguments.add_argument("--threads", type=int, nargs="+",
+                           default=[1, 2, 4, 8])
+    arguments.add_argument("--cpus", type=int, nargs="+")
+    arguments.add_argument("--batch", type=int, default=16)
+    arguments.add_argument("--snapshot")
+    arguments.add_argument("--repeats", type=int, default=3)
+    options = arguments.parse_args()
+    benchmark(
+        options.methods,
+        options.threads,
+        options.cpus,
+        options.batch,
+        options.snapshot,
+        options.repeats
+    )
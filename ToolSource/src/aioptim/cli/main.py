@@ -4,8 +4,10 @@ AIOPTIM command line input entry point.
 
 import typer
 from aioptim.utils.config import Config
+from typing import List
 from typing_extensions import Annotated
 from aioptim.services.controller import schedule_service
+from aioptim.services.classifier import Classifier
 from colorist import Color
 app = typer.Typer(pretty_exceptions_enable=False)
 Y = Color.YELLOW
@@ -148,13 +150,147 @@ def start(
             rich_help_panel="Running Parameters"
         )
     ] = 10,
+    depth: Annotated[
+        int, typer.Option(
+            "-depth",
+            help="The maximum call depth followed from an endpoint",
+            rich_help_panel="Fault Line Limits"
+        )
+    ] = None,
+    fanout: Annotated[
+        int, typer.Option(
+            "-fanout",
+            help="The maximum callees followed from a single method",
+            rich_help_panel="Fault Line Limits"
+        )
+    ] = None,
+    budget: Annotated[
+        int, typer.Option(
+            "-budget",
+            help="The maximum methods classified per endpoint",
+            rich_help_panel="Fault Line Limits"
+        )
+    ] = None,
+    batch_size: Annotated[
+        int, typer.Option(
+            "-batch",
+            help="The number of code chunks classified per batch",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = 32,
+    backend: Annotated[
+        str, typer.Option(
+            "-backend",
+            help="The classifier's inference backend: torch, int8 or onnx",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = "torch",
+    snapshot: Annotated[
+        str, typer.Option(
+            "-snapshot",
+            help="A local classifier model directory, used without the hub",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = None,
+    workers: Annotated[
+        int, typer.Option(
+            "-workers",
+            help="Classifier worker processes, 0 classifies in process",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = 0,
+    max_chunks: Annotated[
+        int, typer.Option(
+            "-max_chunks",
+            help="The maximum 450-token chunks classified per method",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = 16,
+    overlap: Annotated[
+        int, typer.Option(
+            "-overlap",
+            help="The tokens a chunk repeats from the previous chunk",
+            rich_help_panel="Classifier Parameters",
+            min=0,
+            max=Classifier.TOKEN_MAX // 2 - 1
+        )
+    ] = 0,
+    threads: Annotated[
+        int, typer.Option(
+            "-threads",
+            help="The intra-op threads of classifier inference",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = None,
+    tokenizer_parallelism: Annotated[
+        bool, typer.Option(
+            "-parallel_tokenizer/-serial_tokenizer",
+            help="Whether the classifier tokenises in parallel",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = None,
+    affinity: Annotated[
+        List[int], typer.Option(
+            "-cpu",
+            help="A CPU classifier inference is pinned to, repeatable",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = None,
+    normalise: Annotated[
+        bool, typer.Option(
+            "-normalise",
+            help="Normalise code for a model trained on normalised code",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = False,
+    top_k: Annotated[
+        int, typer.Option(
+            "-top_k",
+            help="The maximum slow methods regenerated per cycle",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = 10,
+    confidence: Annotated[
+        float, typer.Option(
+            "-confidence",
+            help="The minimum slow probability of a regenerated method",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = None,
+    region_share: Annotated[
+        float, typer.Option(
+            "-region",
+            help="Regenerate only the region holding this attribution share",
+            rich_help_panel="Classifier Parameters"
+        )
+    ] = None,
 ):
     """
     Checks the setup parameters and starts the service.
     """
     try:
         Config.validate()
-        schedule_service(delay, threshold, Config.get_contents())
+        schedule_service(
+            delay,
+            threshold,
+            Config.get_contents(),
+            depth=depth,
+            fanout=fanout,
+            budget=budget,
+            batch_size=batch_size,
+            backend=backend,
+            snapshot=snapshot,
+            workers=workers,
+            max_chunks=max_chunks,
+            overlap=overlap,
+            threads=threads,
+            tokenizer_parallelism=tokenizer_parallelism,
+            affinity=affinity,
+            normalise=normalise,
+            top_k=top_k,
+            confidence=confidence,
+            region_share=region_share
+        )
     except Exception as e:
         print(f"Error while running the application: {e}")
         exit(1)
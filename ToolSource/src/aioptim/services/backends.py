@@ -0,0 +1,175 @@
+"""
+Inference backends for the slow-code classifier.
+
+The reference backend runs the float32 PyTorch model. On CPU-only
+instances the model can instead run with int8 dynamically quantised
+linear layers, or as an exported ONNX Runtime session. Only the int8
+backend shrinks the resident model; the ONNX session is held in
+addition to it.
+
+ONNX Runtime is optional: pip install onnx onnxruntime
+"""
+from abc import ABC, abstractmethod
+from tempfile import TemporaryDirectory
+import os
+import torch
+
+
+class Backend(ABC):
+    """
+    Runs a sequence classification model on padded token ID batches.
+    """
+    NAME = None
+
+    def __init__(self, model):
+        """
+        Prepares the model for inference.
+
+        Args:
+            model: The loaded transformers model
+        """
+        self.model = model.eval()
+
+    @abstractmethod
+    def __call__(self, input_ids, attention_mask):   # pragma: no cover
+        pass
+
+
+class TorchBackend(Backend):
+    """
+    Reference float32 PyTorch inference.
+    """
+    NAME = "torch"
+
+    def __call__(self, input_ids, attention_mask):
+        """
+        Computes the logits of a batch.
+
+        Args:
+            input_ids: The padded token IDs
+            attention_mask: The attention mask of the padding
+
+        Returns:
+            Tensor of logits per sequence
+        """
+        with torch.inference_mode():
+            return self.model(
+                input_ids=input_ids, attention_mask=attention_mask
+            ).logits
+
+
+class QuantisedBackend(TorchBackend):
+    """
+    PyTorch inference with int8 dynamically quantised linear layers.
+    The model is quantised in place, so it is not held twice.
+    """
+    NAME = "int8"
+
+    def __init__(self, model):
+        """
+        Quantises the model's linear layers.
+
+        Args:
+            model: The loaded transformers model
+        """
+        super().__init__(torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        ))
+
+
+class OnnxBackend(Backend):
+    """
+    ONNX Runtime inference of the exported model.
+
+    The float32 PyTorch model stays resident alongside the session, as
+    the classifier still reads its configuration and attends over it to
+    localise slow regions. This backend trades memory for latency: it
+    does not reduce the classifier's memory, unlike the int8 backend.
+    """
+    NAME = "onnx"
+
+    def __init__(self, model):
+        """
+        Exports the model and opens an ONNX Runtime session over it.
+
+        Args:
+            model: The loaded transformers model
+
+        Raises:
+            ImportError: If ONNX Runtime is not installed
+        """
+        super().__init__(model)
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError(
+                "The onnx backend requires: pip install onnx onnxruntime"
+            )
+        sample = torch.ones((1, 8), dtype=torch.long)
+        axes = {0: "batch", 1: "sequence"}
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "classifier.onnx")
+            torch.onnx.export(
+                self.model,
+                (sample, sample),
+                path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": axes,
+                    "attention_mask": axes,
+                    "logits": {0: "batch"}
+                },
+                dynamo=False
+            )
+            self.session = onnxruntime.InferenceSession(
+                path, providers=["CPUExecutionProvider"]
+            )
+
+    def __call__(self, input_ids, attention_mask):
+        """
+        Computes the logits of a batch.
+
+        Args:
+            input_ids: The padded token IDs
+            attention_mask: The attention mask of the padding
+
+        Returns:
+            Tensor of logits per sequence
+        """
+        return torch.from_numpy(self.session.run(["logits"], {
+            "input_ids": input_ids.numpy(),
+            "attention_mask": attention_mask.numpy()
+        })[0])
+
+
+BACKENDS = {
+    backend.NAME: backend
+    for backend in (TorchBackend, QuantisedBackend, OnnxBackend)
+}
+
+
+def parity(reference, candidate, batches):
+    """
+    Compares a backend against the reference backend on sample batches.
+
+    Args:
+        reference: The reference backend
+        candidate: The backend to compare
+        batches: The (input IDs, attention mask) batches of the sample
+
+    Returns:
+        The share of matching predictions and the largest logit difference
+    """
+    matches, total, difference = 0, 0, 0.0
+    for input_ids, attention_mask in batches:
+        expected = reference(input_ids, attention_mask)
+        actual = candidate(input_ids, attention_mask)
+        matches += (
+            expected.argmax(dim=-1) == actual.argmax(dim=-1)
+        ).sum().item()
+        total += len(expected)
+        difference = max(
+            difference, (expected - actual).abs().max().item()
+        )
+    return matches / total if total else 1.0, difference
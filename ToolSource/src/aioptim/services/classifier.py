@@ -7,11 +7,23 @@ that should be regenerated in the next step.
 """
 
 from transformers import (
-    pipeline,
+    AutoConfig,
     AutoTokenizer,
     AutoModelForSequenceClassification
 )
+from aioptim.services.backends import BACKENDS
+from aioptim.services.workers import ClassifierPool
+from aioptim.utils.cache import ClassificationCache
+from aioptim.utils.node import Node
+from aioptim.utils.normaliser import Normalised, Normaliser
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from hashlib import sha256
+import math
+import os
+import time
+import torch
 
 
 class Classifier:
@@ -21,6 +33,9 @@ class Classifier:
     TOKEN_MAX = 450     # Reduces Token Limit as described in dissertation.
     MODEL_NAME = "LavishKK/graphcodebert-slowcode-detector"
     # Hugging Face Hub repository
+    WARMUP = "def warmup(items):\n    return [item for item in items]"
+    TRIVIAL_STATEMENTS = 3
+    WEIGHTS = (".safetensors", ".bin")   # Fingerprinted weight files
 
     class Label(Enum):
         """
@@ -30,37 +45,592 @@ class Classifier:
         FAST = 0
         ERR = -1
 
-        @staticmethod
-        def pred_to_label(prediction):
-            """
-            Returns the Label associated with the Transformer prediction.
+    def __init__(self, batch_size=32, cache=None, backend="torch",
+                 snapshot=None, workers=0, max_chunks=None, overlap=0,
+                 threads=None, tokenizer_parallelism=None, affinity=None,
+                 normalise=False):
+        """
+        Configures the classifier. The model is only loaded on first use.
+
+        Args:
+            batch_size: The number of chunks classified per forward pass
+            cache: The persistent cache of verdicts, if any
+            backend: The inference backend: 'torch', 'int8' or 'onnx'
+            snapshot: A local model snapshot directory, loaded without
+                Hugging Face Hub access. Defaults to the hub repository.
+            workers: The number of worker processes running inference,
+                none runs it in this process
+            max_chunks: The maximum chunks evaluated per code input,
+                defaults to all of them
+            overlap: The tokens a chunk repeats from the end of the
+                previous chunk, less than half the token limit
+            threads: The intra-op threads inference runs on, defaults to
+                the torch default
+            tokenizer_parallelism: Whether the tokeniser encodes in
+                parallel, defaults to the tokenizers default
+            affinity: The CPUs inference is pinned to, defaults to any.
+                Worker processes divide the CPUs between them.
+            normalise: Whether code is normalised before tokenisation,
+                only for a model trained on normalised code
+
+        Raises:
+            LookupError: If the backend does not exist
+            ValueError: If the overlap is out of range
+            OSError: If CPU affinity is not supported on this platform
+        """
+        if backend not in BACKENDS:
+            raise LookupError(f"Could not find the {backend} backend")
+        if not 0 <= overlap < Classifier.TOKEN_MAX // 2:
+            raise ValueError(
+                f"The overlap must be within [0, {Classifier.TOKEN_MAX // 2})"
+            )
+        if affinity and not hasattr(os, "sched_setaffinity"):
+            raise OSError("CPU affinity is not supported on this platform")
+        self.batch_size = batch_size
+        self.cache = cache
+        self.backend_name = backend
+        self.snapshot = snapshot
+        self.workers = workers
+        self.max_chunks = max_chunks
+        self.overlap = overlap
+        self.threads = threads
+        self.tokenizer_parallelism = tokenizer_parallelism
+        self.affinity = tuple(affinity) if affinity else None
+        self.normalise = normalise
+        self.normaliser = Normaliser() if normalise else None
+        self.pool = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.metrics = {}
+        self._model = None
+        self._tokenizer = None
+        self._backend = None
+        self._revision = None
+
+    def pretrained(self, loader=None):
+        """
+        Loads a pretrained component of the classifier's model.
+
+        Args:
+            loader: The transformers class to load with, defaults to the
+                sequence classification model
+
+        Returns:
+            The loaded component
+        """
+        loader = loader or AutoModelForSequenceClassification
+        return loader.from_pretrained(
+            self.snapshot or Classifier.MODEL_NAME,
+            local_files_only=bool(self.snapshot)
+        )
+
+    def load(self, model=None):
+        """
+        Loads the model, tokeniser and inference backend, if not loaded.
+        The backend is warmed with a dummy batch, so that the first
+        classification is not a cold outlier. Timings go to the metrics.
+
+        Args:
+            model: An already loaded model to use, e.g. one shared by
+                another process
+        """
+        if self._backend:
+            return
+        self._configure()
+        start = time.perf_counter()
+        self._model = model or self.pretrained()
+        self._tokenizer = self.pretrained(AutoTokenizer)
+        self._backend = BACKENDS[self.backend_name](self._model)
+        self.metrics["load_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warmup = self._tokenizer.encode(
+            Classifier.WARMUP, add_special_tokens=False
+        )
+        self.predict([warmup] * self.batch_size)
+        self.metrics["warmup_seconds"] = time.perf_counter() - start
+        self.metrics.pop("tokens", None)
+        self.metrics.pop("padded_tokens", None)
+
+    def _configure(self):
+        """
+        Applies the classifier's thread, tokeniser parallelism and CPU
+        affinity settings to this process. CPUs are only pinned in the
+        process running inference, not in one delegating to workers.
+        """
+        if self.tokenizer_parallelism is not None:
+            os.environ["TOKENIZERS_PARALLELISM"] = str(
+                self.tokenizer_parallelism
+            ).lower()
+        if self.affinity and not self.workers:
+            os.sched_setaffinity(0, self.affinity)
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        self.metrics["threads"] = torch.get_num_threads()
+
+    @property
+    def model(self):
+        """ The loaded transformers model """
+        self.load()
+        return self._model
+
+    @property
+    def tokenizer(self):
+        """ The loaded tokeniser """
+        self.load()
+        return self._tokenizer
+
+    @property
+    def backend(self):
+        """ The loaded inference backend """
+        self.load()
+        return self._backend
+
+    def predict(self, chunks):
+        """
+        Classifies code chunks in batches, each padded to its longest chunk.
+        Special tokens and attention masks are added to the token IDs of
+        each chunk, which are fed to the model without re-tokenising.
+
+        Chunks are batched in order of length, so that chunks of similar
+        length share a batch and little compute is spent on padding.
+
+        Args:
+            chunks: The token IDs of the code chunks to classify
+
+        Returns:
+            List of the probabilities that each chunk is slow, in the order
+            of the chunks
+        """
+        slow = self.model.config.label2id.get('LABEL_1', 1)
+        probabilities = [None] * len(chunks)
+        for batch in Classifier.buckets(chunks, self.batch_size):
+            logits = self.backend(**self._batch([chunks[i] for i in batch]))
+            for i, probability in zip(
+                batch, logits.softmax(dim=-1)[:, slow].tolist()
+            ):
+                probabilities[i] = probability
+        return probabilities
+
+    @staticmethod
+    def buckets(chunks, batch_size):
+        """
+        Groups chunks of similar length into batches.
+
+        Args:
+            chunks: The token IDs of the chunks
+            batch_size: The number of chunks per batch
+
+        Returns:
+            List of batches, each a list of chunk indices
+        """
+        order = sorted(range(len(chunks)), key=lambda i: len(chunks[i]))
+        return [
+            order[i:i+batch_size] for i in range(0, len(order), batch_size)
+        ]
+
+    def _batch(self, chunks):
+        """
+        Builds the padded model inputs of a batch of chunks.
+
+        Args:
+            chunks: The token IDs of the chunks in the batch
+
+        Returns:
+            Dictionary of input ID and attention mask tensors
+        """
+        inputs = [
+            self.tokenizer.build_inputs_with_special_tokens(chunk)
+            for chunk in chunks
+        ]
+        input_ids = torch.full(
+            (len(inputs), max(map(len, inputs))),
+            self.tokenizer.pad_token_id
+        )
+        attention_mask = torch.zeros_like(input_ids)
+        for row, ids in enumerate(inputs):
+            input_ids[row, :len(ids)] = torch.tensor(ids)
+            attention_mask[row, :len(ids)] = 1
+        self.metrics["tokens"] = (
+            self.metrics.get("tokens", 0) + sum(map(len, inputs))
+        )
+        self.metrics["padded_tokens"] = (
+            self.metrics.get("padded_tokens", 0) + input_ids.numel()
+        )
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+    @property
+    def revision(self):
+        """
+        The revision of the loaded model, to invalidate cached verdicts.
+
+        Only the model configuration is read, so cached verdicts can be
+        used without loading the model.
+
+        Returns:
+            The hub commit, or a digest of the local snapshot's files
+        """
+        if self._revision is None:
+            config = (
+                self._model.config if self._model
+                else self.pretrained(AutoConfig)
+            )
+            self._revision = getattr(config, "_commit_hash", None)
+            if not self._revision:
+                path = config.name_or_path
+                self._revision = (
+                    Classifier._fingerprint(path)
+                    if os.path.isdir(path) else path
+                )
+        return self._revision
+
+    @staticmethod
+    def _fingerprint(path):
+        """
+        Digests the size and modification time of a snapshot's
+        configuration and weight files. Unlike the directory's own
+        modification time, this changes when a file is overwritten.
+
+        Args:
+            path: The local snapshot directory
+
+        Returns:
+            The hexadecimal digest
+        """
+        digest = sha256()
+        for entry in sorted(os.scandir(path), key=lambda entry: entry.name):
+            if entry.is_file() and (
+                entry.name == "config.json"
+                or entry.name.endswith(Classifier.WEIGHTS)
+            ):
+                status = entry.stat()
+                digest.update(
+                    f"{entry.name}:{status.st_size}:{status.st_mtime_ns};"
+                    .encode()
+                )
+        return digest.hexdigest()
+
+    def report(self):
+        """
+        Retrieves the metrics recorded since the last report, in this
+        process and in the worker processes.
+        The padding efficiency is the share of real tokens in the batches.
+
+        Returns:
+            Dictionary of metric names to values
+        """
+        report, self.metrics = self.metrics, {}
+        if self.pool:
+            ClassifierPool.merge(report, self.pool.report())
+        if report.get("padded_tokens"):
+            report["padding_efficiency"] = (
+                report["tokens"] / report["padded_tokens"]
+            )
+        return report
+
+    @staticmethod
+    def trivial(code_node):
+        """
+        Decides from the static profile whether a method is obviously fast:
+        a few statements without loops, recursion or I/O.
+
+        Args:
+            code_node: The method node
+
+        Returns:
+            True if the method need not be classified, False otherwise
+        """
+        profile = getattr(code_node, "profile", None)
+        return (
+            isinstance(profile, Node.FileNode.MethodNode.Profile)
+            and not profile.nesting
+            and not profile.recursive
+            and not profile.io_calls
+            and profile.statements <= Classifier.TRIVIAL_STATEMENTS
+        )
+
+    def _workers(self):
+        """
+        Starts the worker pool, if not started, or restarts it if one of
+        its workers stopped.
+
+        Returns:
+            The worker pool
+        """
+        if self.pool and self.pool.broken:
+            self.pool.close()
+            self.pool = None
+        if not self.pool:
+            start = time.perf_counter()
+            self.pool = ClassifierPool(self, self.workers)
+            self.metrics["pool_start_seconds"] = time.perf_counter() - start
+        return self.pool
 
-            Args:
-                prediction: Prediction made by Binary classifier
+    def classify(self, code_nodes):
+        """
+        Classifies code inputs with the model, in the worker processes
+        when there are any.
+
+        Each code input is tokenised once and chunked on its token IDs,
+        at statement boundaries when the code input has any.
+        Chunks are evaluated in rounds, each batching the chunks of every
+        undecided code input. A code input's evaluation stops as soon as
+        its remaining chunks can no longer change its verdict.
+
+        Args:
+            code_nodes: The code inputs to classify
+
+        Returns:
+            List of (label, score) verdicts, where the score is the
+            average slow probability of the code input's evaluated chunks
+        """
+        if self.workers:
+            return self._workers().submit(code_nodes).result()
+
+        code_chunks, chunk_count = [], 0
+        for code_node in code_nodes:
+            encoded, cuts = self.tokenise(code_node)
+            # Chunks input that exceeds the max token length
+            encoded_chunks = [
+                encoded[start:end]
+                for start, end in Classifier.split(
+                    len(encoded), cuts, Classifier.TOKEN_MAX, self.overlap
+                )
+            ]
+            code_chunks.append(encoded_chunks[:self.max_chunks])
+            chunk_count += len(encoded_chunks)
+
+        chunks = [[] for _ in code_nodes]
+        pending = list(range(len(code_nodes)))
+        while pending:
+            owners, batch = [], []
+            for owner in pending:
+                start = len(chunks[owner])
+                step = Classifier.undecided(
+                    chunks[owner], len(code_chunks[owner])
+                )
+                for chunk in code_chunks[owner][start:start+step]:
+                    owners.append(owner)
+                    batch.append(chunk)
+            for owner, probability in zip(owners, self.predict(batch)):
+                chunks[owner].append(probability)
+            pending = [
+                owner for owner in pending
+                if Classifier.undecided(
+                    chunks[owner], len(code_chunks[owner])
+                )
+            ]
+
+        self.metrics["chunks_skipped"] = self.metrics.get(
+            "chunks_skipped", 0
+        ) + chunk_count - sum(map(len, chunks))
+        return [
+            (
+                Classifier.Label.SLOW if sum(probabilities) >= total / 2
+                else Classifier.Label.FAST,
+                sum(probabilities) / len(probabilities)
+            )
+            for probabilities, total in zip(chunks, map(len, code_chunks))
+        ]
+
+    def tokenise(self, code_node):
+        """
+        Tokenises a code input, normalised if the classifier normalises,
+        and locates its statement boundaries among the tokens.
 
-            Returns:
-                Associated label
-            """
-            match prediction:
-                case 'LABEL_0':
-                    return Classifier.Label.FAST
-                case 'LABEL_1':
-                    return Classifier.Label.SLOW
-                case _:
-                    return Classifier.Label.ERR
+        Args:
+            code_node: The code input, with its language and statement
+                boundaries if any
 
-    def __init__(self):
+        Returns:
+            The token IDs, and a dictionary of token index to nesting
+            depth of the tokens starting a statement
         """
-        Initialises the model, tokeniser and pipeline.
+        _, encoding, cuts = self._encode(code_node)
+        return encoding["input_ids"], cuts
+
+    def _encode(self, code_node):
         """
-        self.model = AutoModelForSequenceClassification.from_pretrained(
-            Classifier.MODEL_NAME
+        Tokenises a code input, normalised if the classifier normalises,
+        with the character offsets of its tokens when the tokeniser
+        provides them.
+
+        Args:
+            code_node: The code input
+
+        Returns:
+            The normalised code, the tokeniser's encoding and the
+            dictionary of token index to nesting depth of statement starts
+        """
+        normalised = (
+            self.normaliser.normalise(
+                code_node.method, getattr(code_node, "language", None)
+            ) if self.normalise
+            else Normalised.unchanged(code_node.method)
+        )
+        encoding = self.tokenizer(
+            normalised.code,
+            add_special_tokens=False,
+            truncation=False,
+            return_offsets_mapping=self.tokenizer.is_fast,
+            verbose=False
         )
-        self.tokenizer = AutoTokenizer.from_pretrained(Classifier.MODEL_NAME)
-        self.pipeline = pipeline(
-            task="text-classification",
-            model=self.model,
-            tokenizer=self.tokenizer
+        starts = [start for start, _ in encoding.get("offset_mapping", [])]
+        cuts = {}
+        for offset, depth in getattr(code_node, "boundaries", ()):
+            index = bisect_left(starts, normalised.position(offset))
+            if 0 < index < len(starts):
+                cuts[index] = min(depth, cuts.get(index, depth))
+        return normalised, encoding, cuts
+
+    def attribute(self, code_node):
+        """
+        Attributes a code input's classification to its tokens, by the
+        attention the classification token pays to each token, averaged
+        over the model's layers and heads.
+
+        Args:
+            code_node: The code input
+
+        Returns:
+            List of (start, end, score) character ranges into the code
+            input, empty if the tokeniser provides no offsets
+        """
+        normalised, encoding, cuts = self._encode(code_node)
+        encoded = encoding["input_ids"]
+        offsets = encoding.get("offset_mapping")
+        if not offsets:
+            return []
+        prefix = self.tokenizer.build_inputs_with_special_tokens([-1]).index(
+            -1
+        )
+        scores = []
+        for start, end in Classifier.split(
+            len(encoded), cuts, Classifier.TOKEN_MAX
+        ):
+            input_ids = torch.tensor([
+                self.tokenizer.build_inputs_with_special_tokens(
+                    encoded[start:end]
+                )
+            ])
+            with torch.inference_mode():
+                attentions = self.model(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    output_attentions=True
+                ).attentions
+            attention = torch.stack(attentions).mean(dim=(0, 2))[0, 0]
+            scores.extend(
+                attention[prefix:prefix + end - start].tolist()
+            )
+        return [
+            (
+                normalised.origin(token_start),
+                normalised.origin(token_end - 1) + 1,
+                score
+            )
+            for (token_start, token_end), score in zip(offsets, scores)
+            if token_end > token_start
+        ]
+
+    def localise(self, code_node, share=0.5):
+        """
+        Localises the slow region of a method: the smallest statement
+        holding at least a share of the method's attribution. The region
+        is localised in the worker processes when there are any.
+
+        Args:
+            code_node: The method node
+            share: The share of the attribution the region must hold
+
+        Returns:
+            The (start, end) character range of the region in the method,
+            or None if no single statement stands out
+        """
+        regions = tuple(getattr(code_node, "regions", ()))
+        if not regions:
+            return None
+        if self.workers:
+            return self._workers().submit([code_node], share).result()[0]
+        scores = self.attribute(code_node)
+        total = sum(score for _, _, score in scores)
+        region = None
+        for start, end, _ in regions:
+            mass = sum(
+                score for token_start, token_end, score in scores
+                if token_start >= start and token_end <= end
+            )
+            if total and mass >= share * total and (
+                region is None or end - start < region[1] - region[0]
+            ):
+                region = (start, end)
+        return region
+
+    @staticmethod
+    def split(length, cuts, limit, overlap=0):
+        """
+        Splits a token sequence into chunks of at most limit tokens.
+
+        Each chunk ends at the shallowest statement boundary in the latter
+        half of its window and past the previous chunk, the latest one
+        among equally shallow ones, so
+        that loops and blocks are not cut across chunks where avoidable.
+        Without a boundary there, the chunk fills the window. Overlapping
+        chunks start at the first boundary within the overlap, if any.
+
+        Args:
+            length: The number of tokens
+            cuts: Dictionary of token index to nesting depth, of the
+                tokens starting a statement
+            limit: The maximum tokens per chunk
+            overlap: The tokens a chunk repeats from the previous chunk
+
+        Returns:
+            List of (start, end) token ranges
+        """
+        positions = sorted(cuts)
+        chunks, start, end = [], 0, 0
+        while start + limit < length:
+            window = positions[
+                bisect_left(positions, max(start + limit // 2, end + 1)):
+                bisect_right(positions, start + limit)
+            ]
+            end = start + limit
+            if window:
+                end = min(window, key=lambda i: (cuts[i], -i))
+            chunks.append((start, end))
+            following = end - overlap
+            if overlap:
+                within = positions[
+                    bisect_left(positions, following):
+                    bisect_left(positions, end)
+                ]
+                following = within[0] if within else following
+            start = max(following, start + 1)
+        chunks.append((start, length))
+        return chunks
+
+    @staticmethod
+    def undecided(probabilities, total):
+        """
+        Counts the chunks still to evaluate before a code input's verdict
+        could be decided. A code input is slow when the average slow
+        probability of all its chunks is at least a half.
+
+        Args:
+            probabilities: The slow probabilities of the evaluated chunks
+            total: The number of chunks of the code input
+
+        Returns:
+            The fewest further chunks that could decide the verdict,
+            0 if it is decided
+        """
+        seen, remaining = sum(probabilities), total - len(probabilities)
+        if seen >= total / 2 or seen + remaining < total / 2:
+            return 0
+        return min(
+            math.ceil(total / 2 - seen),
+            math.floor(seen + remaining - total / 2) + 1,
+            remaining
         )
 
     def __call__(self, *args, **kwargs):
@@ -68,23 +638,104 @@ class Classifier:
         Performs inference on the code inputs using the
         trained deep learning classifier.
 
+        Trivial methods are decided fast by the static pre-filter, and
+        cached verdicts are consulted before tokenisation, so only code
+        inputs not classified by this model revision reach the model.
+        The slow probability is attached to each returned code block.
+
         Returns:
             List of code blocks classified as 'Slow' code
         """
-        slow_nodes = []
-        for code_node in args:
-            encoded = self.tokenizer.encode(
-                code_node.method, max_length=5000, truncation=False)
-            code_chunks = [
-                self.tokenizer.decode(encoded[i:i+Classifier.TOKEN_MAX])
-                for i in range(0, len(encoded), Classifier.TOKEN_MAX)
-            ]
-            chunks = list(map(lambda chunk: self.pipeline(
-                chunk)[0]['label'], code_chunks))
-            # Chunks input that exceeds the max token length
-            classification = Classifier.Label.pred_to_label(
-                max(['LABEL_1', 'LABEL_0'], key=chunks.count)
+        methods = len(args)
+        args = [code_node for code_node in args
+                if not Classifier.trivial(code_node)]
+        self.metrics["short_circuited"] = (
+            self.metrics.get("short_circuited", 0) + methods - len(args)
+        )
+        if not self.cache:
+            verdicts = self.classify(args)
+            return Classifier._slow(zip(args, verdicts))
+
+        model = f"{Classifier.MODEL_NAME}:{self.backend_name}"
+        if self.normalise:
+            model += ":normalised"
+        if self.max_chunks is not None:
+            model += f":chunks={self.max_chunks}"
+        if self.overlap:
+            model += f":overlap={self.overlap}"
+        revision = self.revision
+        digests = [ClassificationCache.digest(node.method) for node in args]
+        cached = self.cache.get(digests, model, revision)
+        pending = {
+            digest: code_node
+            for digest, code_node in zip(digests, args)
+            if digest not in cached
+        }
+        if pending:
+            classified = {
+                digest: (label.value, score)
+                for digest, (label, score) in zip(
+                    pending, self.classify(list(pending.values()))
+                )
+            }
+            self.cache.put(classified, model, revision)
+            cached.update(classified)
+        return Classifier._slow(
+            (code_node, (Classifier.Label(label), score))
+            for code_node, (label, score) in zip(
+                args, map(cached.get, digests)
             )
-            if classification == Classifier.Label.SLOW:
-                slow_nodes.append(code_node)
-        return slow_nodes
+        )
+
+    @staticmethod
+    def _slow(verdicts):
+        """
+        Keeps the code blocks classified as slow, with their probability.
+
+        Args:
+            verdicts: Pairs of code blocks and (label, score) verdicts
+
+        Returns:
+            List of code blocks classified as 'Slow' code
+        """
+        slow = []
+        for code_node, (label, score) in verdicts:
+            if label == Classifier.Label.SLOW:
+                code_node.probability = score
+                slow.append(code_node)
+        return slow
+
+    @staticmethod
+    def select(code_blocks, top_k=None, confidence=None):
+        """
+        Bounds the slow code blocks passed on for regeneration.
+
+        Args:
+            code_blocks: The code blocks classified as slow
+            top_k: The maximum code blocks kept, the most probable first
+            confidence: The minimum slow probability of a kept code block
+
+        Returns:
+            List of the kept code blocks
+        """
+        if confidence is not None:
+            code_blocks = [
+                code_block for code_block in code_blocks
+                if (code_block.probability or 0) >= confidence
+            ]
+        if top_k is not None:
+            code_blocks = sorted(
+                code_blocks,
+                key=lambda code_block: code_block.probability or 0,
+                reverse=True
+            )[:top_k]
+        return list(code_blocks)
+
+    def submit(self, *args):
+        """
+        Classifies code inputs asynchronously.
+
+        Returns:
+            Future of the list of code blocks classified as 'Slow' code
+        """
+        return self.executor.submit(self, *args)
@@ -15,6 +15,7 @@ from aioptim.services.classifier import Classifier
 from aioptim.services.generator import Generator
 from aioptim.services.processor import GithubProcessor
 from aioptim.utils.state import State
+from aioptim.utils.cache import ClassificationCache
 from aioptim.services.instana import IBM
 from aioptim.utils.info import details, get_col
 from prefect.cache_policies import NO_CACHE
@@ -44,6 +45,10 @@ def generate_code(state):
     Calls the code generation module, ensuring the optimised
     code still behaves the same as the slow code.
 
+    When the slow region of a method is localised, only the region is
+    described and rewritten, with its enclosing lines as context, and
+    the rewrite is spliced back into the method.
+
     Args:
         state: The mutable state object
 
@@ -56,22 +61,38 @@ def generate_code(state):
                 current_runs = 0
                 is_generated = False
                 generated_code = ""
+                region = getattr(slow_method, "region", None)
+                code = slow_method.method
+                if region:
+                    code = code[region[0]:region[1]]
+                    context = slow_method.context(*region)
                 while current_runs < state.generator.max_runs and not is_generated:
                     current_runs += 1
                     description = state.generator.describe(
-                        slow_method.method,
-                        slow_method.parent.language
-                    )
-                    generated_code = state.generator.generate(
-                        slow_method.method,
-                        slow_method.id,
+                        code,
                         slow_method.parent.language
                     )
+                    if region:
+                        generated_code = state.generator.generate_region(
+                            code,
+                            context,
+                            slow_method.parent.language
+                        )
+                    else:
+                        generated_code = state.generator.generate(
+                            code,
+                            slow_method.id,
+                            slow_method.parent.language
+                        )
                     is_generated = state.generator.validate(
                         description,
                         generated_code,
                         slow_method.parent.language
                     )
+                if region:
+                    generated_code = Generator.splice(
+                        slow_method.method, region, generated_code
+                    )
                 slow_method.generated_code = generated_code
         else:
             raise LookupError(
@@ -83,6 +104,14 @@ def slow_code(state):
     Calls the classifier to reduce the number of offending method blocks.
     The classifier filters out fast source of code.
 
+    The classifications submitted while tracing the fault line are
+    gathered, and the classifier's metrics for the cycle are reported.
+    Only the most probably slow methods are kept, within the top-K
+    and confidence limits, to bound the generator's work per cycle.
+    When a region share is set, the slow region of each kept method is
+    then localised. A single method is passed on without classification,
+    so the model is not loaded for it.
+
     Args:
         state: The mutable state object
     """
@@ -90,7 +119,52 @@ def slow_code(state):
         if len(state.fault_line) == 1:
             state.slow_code_blocks = list(state.fault_line)
         elif len(state.fault_line) > 1:
-            state.slow_code_blocks = state.classifier(*state.fault_line)
+            classifications = getattr(state, "classifications", None) or [
+                state.classifier.submit(*state.fault_line)
+            ]
+            state.slow_code_blocks = Classifier.select(
+                [
+                    code_block
+                    for classification in classifications
+                    for code_block in classification.result()
+                ],
+                top_k=state.top_k,
+                confidence=state.confidence
+            )
+            if state.region_share is not None:
+                for code_block in state.slow_code_blocks:
+                    code_block.region = state.classifier.localise(
+                        code_block, state.region_share
+                    )
+            metrics = state.classifier.report()
+            if metrics:
+                print(f"Classifier metrics: {metrics}")
+
+def index_repository(state, parser, extension):
+    """
+    Brings the parser's repository index up to the latest commit.
+
+    The index is patched with the difference to the last processed
+    commit, falling back to a full rebuild when there is none.
+
+    Args:
+        state: The mutable state object
+        parser: The parser holding the index
+        extension: The file extension the parser handles
+    """
+    head = state.processor.head()
+    if parser.commit == head:
+        return
+    if parser.commit:
+        try:
+            changed, removed = state.processor.diff(
+                parser.commit, head, extension
+            )
+            parser.update(changed, removed, head)
+            return
+        except LookupError:
+            pass
+    parser.index(state.processor[extension, head], head)
 
 @task(name="get-fault-line", log_prints=True)
 def fault_line(state):
@@ -98,20 +172,41 @@ def fault_line(state):
     This creates numerous method traces for each
     instance of possibly slow code.
 
+    Each trace is bounded by the state's depth and fan-out limits,
+    and capped at a budget of the hottest methods per endpoint, when
+    they are set. Unbounded traces use the parser's memoised reachable
+    sets, shared by every endpoint.
+
+    Once the fault line holds more than one method, the methods are
+    submitted to the classifier as they are traced, so classification
+    runs alongside the tracing of the remaining endpoints.
+
     Args:
         state: The mutable state object
     """
     state.fault_line = set()
+    state.classifications = []
+    submitted = set()
     if state and hasattr(state, "endpoints") and state.endpoints:
         for endpoint in state.endpoints:
             extension = details(endpoint.technology, "extension")
             parser = details(endpoint.technology, "parser")
-            files = state.processor[extension]
-            for file in files:
-                parser.parse_file_methods(file)
-            parser.extend_file_methods(files)
-            endpoint_method = parser.endpoint(files, endpoint.label)
-            state.fault_line.update(parser.parse_method_calls(endpoint_method))
+            index_repository(state, parser, extension)
+            endpoint_method = parser.endpoint(
+                list(parser.files.values()), endpoint.label
+            )
+            state.fault_line.update(parser.parse_method_calls(
+                endpoint_method,
+                depth=state.depth,
+                fanout=state.fanout,
+                budget=state.budget
+            ))
+            pending = state.fault_line - submitted
+            if len(state.fault_line) > 1 and pending:
+                state.classifications.append(
+                    state.classifier.submit(*pending)
+                )
+                submitted |= pending
 
 @task(name="get-slow-endpoints", log_prints=True)
 def endpoints(state):
@@ -152,7 +247,23 @@ def schedule_service(
     threshold,
     contents,
     test_mode=False,
-    state=None
+    state=None,
+    depth=None,
+    fanout=None,
+    budget=None,
+    batch_size=32,
+    backend="torch",
+    snapshot=None,
+    workers=0,
+    max_chunks=None,
+    overlap=0,
+    threads=None,
+    tokenizer_parallelism=None,
+    affinity=None,
+    normalise=False,
+    top_k=None,
+    confidence=None,
+    region_share=None
 ):
     """
     This method registers the scheduled service.
@@ -163,6 +274,23 @@ def schedule_service(
         contents: The contents of a configuration file
         test_mode: Whether the system is currently being tested.
         state: The state to test the system under
+        depth: The maximum call depth of a fault line
+        fanout: The maximum callees followed per method
+        budget: The maximum methods in a fault line per endpoint
+        batch_size: The number of code chunks classified per batch
+        backend: The classifier's inference backend
+        snapshot: A local snapshot of the classifier's model
+        workers: The number of classifier worker processes
+        max_chunks: The maximum chunks classified per method
+        overlap: The tokens a chunk repeats from the previous chunk
+        threads: The intra-op threads of the classifier's inference
+        tokenizer_parallelism: Whether the classifier tokenises in parallel
+        affinity: The CPUs the classifier's inference is pinned to
+        normalise: Whether the classifier normalises code before tokenising
+        top_k: The maximum slow methods regenerated per cycle
+        confidence: The minimum slow probability of a regenerated method
+        region_share: The share of a method's attribution its slow region
+            must hold, None regenerates whole methods
     """
 
     logger = logging.getLogger()
@@ -188,9 +316,27 @@ def schedule_service(
                     contents[config.REPOSITORY.value],
                     contents[config.BRANCH.value]
                 ),
-                classifier=Classifier(),
+                classifier=Classifier(
+                    batch_size=batch_size,
+                    cache=ClassificationCache(),
+                    backend=backend,
+                    snapshot=snapshot,
+                    workers=workers,
+                    max_chunks=max_chunks,
+                    overlap=overlap,
+                    threads=threads,
+                    tokenizer_parallelism=tokenizer_parallelism,
+                    affinity=affinity,
+                    normalise=normalise
+                ),
                 threshold=threshold,
-                delay=delay
+                delay=delay,
+                depth=depth,
+                fanout=fanout,
+                budget=budget,
+                top_k=top_k,
+                confidence=confidence,
+                region_share=region_share
             )
         except Exception as e:
             print(f"Error with configuring the application {e}...")
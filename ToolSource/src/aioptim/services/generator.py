@@ -69,6 +69,48 @@ class Generator(Conn):
             )
         )
 
+    def generate_region(self, code, context, language):
+        """
+        Generate source code from the slow region of a method
+
+        Args:
+            code: The referenced slow region
+            context: The lines of the method enclosing the region
+            language: The language implementation of the code, e.g. Java
+
+        Returns:
+            The optimised region
+        """
+        return self._send(
+            Generator._replace(
+                self.prompts[Prompt.PromptKeys.REGION_GEN.value],
+                {
+                    "$CODE$": code,
+                    "$LANGUAGE$": language,
+                    "$CONTEXT$": context
+                }
+            )
+        )
+
+    @staticmethod
+    def splice(code, region, generated_code):
+        """
+        Replaces a region of a method with its optimised rewrite.
+
+        Args:
+            code: The method's source code
+            region: The (start, end) character range of the region
+            generated_code: The optimised region
+
+        Returns:
+            The method with the region replaced, or an empty string if
+            no rewrite was generated
+        """
+        if not generated_code.strip():
+            return ""
+        start, end = region
+        return code[:start] + generated_code.strip() + code[end:]
+
     def describe(self, code, language):
         """
         Describes source code for the later verification stages
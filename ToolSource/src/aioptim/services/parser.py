@@ -7,12 +7,375 @@ from tree_sitter import Language, Parser
 import tree_sitter_java as tsjava
 import tree_sitter_python as tspython
 from rapidfuzz import fuzz
-from collections import deque
+from heapq import heappop, heappush
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from multiprocessing import get_context
+from pathlib import Path
+from typing import NamedTuple, Union
 from abc import abstractmethod, ABC
+import os
+import re
+
+
+class MethodRecord(NamedTuple):
+    """
+    Plain record of a method extracted from a file. Parameters, span and
+    decorator are byte ranges into the file, the calls are the names
+    invoked within the method, the profile holds its static hotness
+    signals and the statements are the (start byte, end byte, nesting
+    depth) of its statements.
+    """
+    identifier: str
+    parameters: tuple
+    span: tuple
+    decorator: Union[tuple, None]
+    cls: Union[str, None]
+    calls: tuple
+    profile: tuple
+    statements: tuple
+
+
+@dataclass
+class Extract:
+    """
+    Plain records extracted from a single file in one pass over its tree.
+    These are returned from worker processes and merged into the file.
+    """
+    methods: list = field(default_factory=list)
+    imports: list = field(default_factory=list)
+    package: Union[str, None] = None
+    routes: list = field(default_factory=list)
+
+
+_WORKER_PARSERS = {}
+
+
+def _extract(parser_type, code):
+    """
+    Extracts the records of a file inside a worker process.
+    Tree-sitter parsers cannot be shared, so each worker builds its own.
+
+    Args:
+        parser_type: The parser class for the file's language
+        code: The encoded source code of the file
+
+    Returns:
+        The extracted records
+    """
+    if parser_type not in _WORKER_PARSERS:
+        _WORKER_PARSERS[parser_type] = parser_type()
+    return _WORKER_PARSERS[parser_type].extract(code)
+
+
+class RouteTable:
+    """
+    Path-template trie mapping HTTP routes to the methods handling them.
+    Resolving a path walks one level of the trie per path segment.
+    """
+    VERBS = {"GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"}
+    TEMPLATE = re.compile(r"^(\{[^}]*\}|<[^>]*>|:\w+)$")
+
+    class Segment:
+        """
+        Trie node for a single path segment.
+        Literal segments are preferred over the template segment.
+        """
+        __slots__ = ("children", "template", "handlers")
+
+        def __init__(self):
+            self.children = {}
+            self.template = None
+            self.handlers = {}  # HTTP verb, or None for any, to methods
+
+    def __init__(self):
+        """
+        Creates an empty route table.
+        """
+        self.root = RouteTable.Segment()
+        self.owners = {}    # Path of the declaring file to its handlers
+
+    @staticmethod
+    def build(files):
+        """
+        Creates a route table from the routes declared in the files.
+
+        Args:
+            files: The parsed files
+
+        Returns:
+            The route table
+        """
+        routes = RouteTable()
+        for file in files:
+            routes.add(file)
+        return routes
+
+    @staticmethod
+    def segments(path):
+        """
+        Splits a URL path into its segments.
+
+        Args:
+            path: The URL path, with an optional query string
+
+        Returns:
+            List of non-empty path segments
+        """
+        return [part for part in path.split("?")[0].split("/") if part]
+
+    def add(self, file):
+        """
+        Adds the routes declared by a file.
+
+        Args:
+            file: The declaring file
+        """
+        for identifier, span, verbs, path in file.routes:
+            method = next((
+                method for method in file.get(identifier)
+                if (method.start, method.end) == span
+            ), None)
+            if method is None:
+                continue
+            segment = self.root
+            for part in RouteTable.segments(path):
+                if RouteTable.TEMPLATE.match(part):
+                    segment.template = segment.template or RouteTable.Segment()
+                    segment = segment.template
+                else:
+                    segment = segment.children.setdefault(
+                        part, RouteTable.Segment()
+                    )
+            for verb in verbs or (None,):
+                segment.handlers.setdefault(verb, []).append(method)
+                self.owners.setdefault(file.base.path, []).append(
+                    (segment, verb, method)
+                )
+
+    def remove(self, path):
+        """
+        Removes the routes declared by a file.
+
+        Args:
+            path: The path of the declaring file
+        """
+        for segment, verb, method in self.owners.pop(path, []):
+            segment.handlers[verb].remove(method)
+            if not segment.handlers[verb]:
+                del segment.handlers[verb]
+
+    def match(self, label):
+        """
+        Resolves an endpoint label, e.g. 'GET /user/{id}', to its handler.
+        Concrete and templated label segments both match templates.
+
+        Args:
+            label: The endpoint label, optionally prefixed by an HTTP verb
+
+        Returns:
+            The handling method, None if there is no matching route
+        """
+        def handlers(segment):
+            if not verb:
+                return [
+                    method
+                    for methods in segment.handlers.values()
+                    for method in methods
+                ]
+            return (segment.handlers.get(verb.upper(), []) +
+                    segment.handlers.get(None, []))
+
+        def walk(segment, index):
+            if index == len(parts):
+                return handlers(segment)
+            found = None
+            if parts[index] in segment.children:
+                found = walk(segment.children[parts[index]], index + 1)
+            if not found and segment.template:
+                found = walk(segment.template, index + 1)
+            return found
+
+        verb, _, path = label.strip().partition(" ")
+        if verb.upper() not in RouteTable.VERBS:
+            verb, path = None, label.strip()
+        parts = RouteTable.segments(path.strip())
+        found = walk(self.root, 0)
+        return found[0] if found else None
+
+
+class CallGraph:
+    """
+    Memoised call graph over interned method symbols.
+
+    Callees are resolved once per method and reachable sets are computed
+    once per strongly connected component, so the traces of many
+    endpoints cost a single traversal of their union.
+    """
+
+    def __init__(self):
+        """
+        Creates an empty call graph.
+        """
+        self.methods = {}       # Symbol to method node
+        self.callees = {}       # Symbol to the symbols it calls
+        self.reachable = {}     # Symbol to the symbols it reaches
+
+    def clear(self):
+        """
+        Forgets the memoised calls, once the methods or links change.
+        """
+        self.methods.clear()
+        self.callees.clear()
+        self.reachable.clear()
+
+    def edges(self, symbol):
+        """
+        Retrieves the methods called by a method.
+
+        Args:
+            symbol: The symbol of the calling method
+
+        Returns:
+            Tuple of callee symbols
+        """
+        if symbol not in self.callees:
+            node = self.methods[symbol]
+            callees = {}
+            for call in node.calls:
+                for callee in node.parent.resolve(call):
+                    self.methods.setdefault(callee.symbol, callee)
+                    callees[callee.symbol] = None
+            self.callees[symbol] = tuple(callees)
+        return self.callees[symbol]
+
+    def reach(self, method):
+        """
+        Retrieves every method reachable from a method, itself included.
+
+        Components are found with an iterative Tarjan traversal. Each
+        component shares one reachable set, so cycles are handled and
+        components reached before are not traversed again.
+
+        Args:
+            method: The method node to begin from
+
+        Returns:
+            Frozen set of reachable symbols
+        """
+        self.methods.setdefault(method.symbol, method)
+        if method.symbol in self.reachable:
+            return self.reachable[method.symbol]
+        index, low, stack, on_stack = {}, {}, [], set()
+
+        def visit(symbol):
+            index[symbol] = low[symbol] = len(index)
+            stack.append(symbol)
+            on_stack.add(symbol)
+            work.append((symbol, iter(self.edges(symbol))))
+
+        work = []
+        visit(method.symbol)
+        while work:
+            symbol, callees = work[-1]
+            for callee in callees:
+                if callee in self.reachable:
+                    continue
+                if callee not in index:
+                    visit(callee)
+                    break
+                if callee in on_stack:
+                    low[symbol] = min(low[symbol], index[callee])
+            else:
+                work.pop()
+                if work:
+                    caller = work[-1][0]
+                    low[caller] = min(low[caller], low[symbol])
+                if low[symbol] == index[symbol]:
+                    component = set()
+                    while symbol not in component:
+                        component.add(stack.pop())
+                    on_stack -= component
+                    reachable = set(component)
+                    for member in component:
+                        for callee in self.edges(member):
+                            if callee not in component:
+                                reachable |= self.reachable[callee]
+                    reachable = frozenset(reachable)
+                    for member in component:
+                        self.reachable[member] = reachable
+        return self.reachable[method.symbol]
 
 
 class BaseParser(ABC):
     """ Base parser class providing the shared functionality """
+    PARALLEL_MIN = 64   # Fewer files do not outweigh starting the workers
+    IO = re.compile(
+        r"(?i)(^|[._])(read|write|open|fetch|query|execute|request|send|"
+        r"recv|load|save|connect|select|insert|update|delete|find|sleep)"
+    )
+    COLLECTIONS = re.compile(
+        r"(?i)^(append|add|addAll|extend|insert|remove|pop|put|contains|"
+        r"containsKey|index|indexOf|count|sort|sorted|copy|stream)$"
+    )
+
+    def __init__(self):
+        """
+        Creates an empty repository index, not yet tied to a commit.
+        """
+        self._reset()
+
+    def _reset(self):
+        """
+        Empties the repository index.
+        """
+        self.commit = None
+        self.files = {}         # Path to file
+        self.names = {}         # Name a file is referred by to files
+        self.importers = {}     # Name to paths of files referring to it
+        self.links = {}         # Path to paths of the files it imports
+        self.dependents = {}    # Path to paths of the files importing it
+        self.routes = RouteTable()
+        self.graph = CallGraph()
+
+    def index(self, files, commit):
+        """
+        Builds the repository index from scratch.
+
+        Args:
+            files: Every file in the repository
+            commit: The commit the files were retrieved at
+        """
+        self.parse_files(files)
+        self.extend_file_methods(files)
+        self.commit = commit
+
+    def update(self, changed, removed, commit):
+        """
+        Patches the repository index with the difference to a new commit.
+
+        Only added or modified files are parsed, deleted files are dropped
+        and only the files whose imports may now resolve differently are
+        relinked, so the cost follows the churn rather than the repository.
+
+        Args:
+            changed: The added or modified files
+            removed: The paths of the deleted files
+            commit: The commit the difference leads to
+        """
+        affected = set()
+        for path in set(removed) | {file.base.path for file in changed}:
+            if path in self.files:
+                affected |= self._unregister(self.files[path])
+        self.parse_files(changed)
+        for file in changed:
+            affected |= self._register(file)
+        for path in affected:
+            if path in self.files:
+                self._link(self.files[path])
+        self.graph.clear()
+        self.commit = commit
 
     def parse_file_methods(self, file):
         """
@@ -22,61 +385,249 @@ class BaseParser(ABC):
         Args:
             file: The file to operate on
         """
+        BaseParser._merge(file, self.extract(file.buffer))
+        self.graph.clear()
+
+    def parse_files(self, files, workers=None):
+        """
+        Retrieves all the methods in the given files.
+
+        Files are spread across a pool of worker processes, which return
+        plain records that are merged into the files in this process.
+
+        Args:
+            files: The files to operate on
+            workers: The number of worker processes, defaults to CPU count
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(files) < BaseParser.PARALLEL_MIN:
+            for file in files:
+                self.parse_file_methods(file)
+            return
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn")
+        ) as pool:
+            records = pool.map(
+                _extract,
+                repeat(type(self)),
+                [file.buffer for file in files],
+                chunksize=max(1, len(files) // (workers * 4))
+            )
+            for file, record in zip(files, records):
+                BaseParser._merge(file, record)
+        self.graph.clear()
+
+    def extract(self, code):
+        """
+        Extracts the method, call site, import and route records of
+        source code, walking its syntax tree once with the combined query.
+        Methods are recorded as byte ranges into the code.
+
+        Each method is profiled with cheap static signals: its deepest
+        loop nesting, the calls made inside loops, the I/O-looking calls,
+        its statements, recursion and the collection operations in loops.
+        Calls made in a method's decorators are not the method's calls.
+        The span of each statement is recorded with its nesting depth, as
+        the boundaries a method can be chunked on and the regions its slow
+        code can be localised to.
+
+        Args:
+            code: The encoded source code
+
+        Returns:
+            The extracted records
+        """
+        def span(node):
+            return node.start_byte, node.end_byte
+
+        def enclosing(node):
+            loops, depth, node = 0, 0, node.parent
+            while node:
+                if node.id in profiles:
+                    yield node.id, loops, depth
+                loops += node.id in loop_ids
+                depth += node.id in statement_ids
+                node = node.parent
+
+        def in_decorator(node):
+            while node and node.id not in profiles:
+                if node.type == "decorator":
+                    return True
+                node = node.parent
+            return False
+
         def process_match(matches):
-            for match in matches:
-                matched_items = match[1]
+            for matched_items in matches:
                 method_signature = matched_items['identifier'][0].text.decode()
-                parameters = matched_items['parameters'][0].text.decode()
+                parameters = matched_items['parameters'][0]
                 decorator = matched_items.get('decorator', None)
                 if decorator:
-                    decorator = decorator[0].text.decode()
-                method = matched_items['method'][0].text.decode()
-                file.methods[
-                    method_signature
-                ] = Node.FileNode.MethodNode(
-                    parent=file,
-                    id=matched_items['identifier'][0].text.decode(),
-                    params=parameters,
-                    method=method,
-                    decorator=decorator
+                    decorator = span(decorator[0])
+                method = matched_items['method'][0]
+                cls = self._enclosing_class(method)
+                names[method.id] = method_signature
+                key = (cls, method_signature, parameters.text)
+                methods[key] = MethodRecord(
+                    identifier=method_signature,
+                    parameters=span(parameters),
+                    span=span(method),
+                    decorator=decorator,
+                    cls=cls,
+                    calls=calls.setdefault(method.id, {}),
+                    profile=profiles.setdefault(method.id, dict.fromkeys(
+                        Node.FileNode.MethodNode.Profile._fields, 0
+                    )),
+                    statements=statements.setdefault(method.id, [])
                 )
 
-        tree = self.parser.parse(file.raw_code.encode())
-        process_match(self.queries['method_query'].matches(tree.root_node))
-        process_match(self.queries['decorator_query'].matches(tree.root_node))
+        tree = self.parser.parse(code)
+        captures = {kind: [] for kind in self.patterns}
+        for index, matched_items in self.query.matches(tree.root_node):
+            captures[self.kinds[index]].append(matched_items)
+
+        methods, names, calls, profiles, statements = {}, {}, {}, {}, {}
+        process_match(captures['method'])
+        process_match(captures['decorator'])
+        loop_ids = {match['loop'][0].id for match in captures['loop']}
+        statement_ids = {
+            match['statement'][0].id for match in captures['statement']
+        }
+        for matched_items in captures['loop']:
+            for method, loops, _ in enclosing(matched_items['loop'][0]):
+                profile = profiles[method]
+                profile['nesting'] = max(profile['nesting'], loops + 1)
+        for matched_items in captures['statement']:
+            statement = matched_items['statement'][0]
+            for method, _, depth in enclosing(statement):
+                profiles[method]['statements'] += 1
+                statements[method].append((*span(statement), depth))
+        for matched_items in captures['call']:
+            if in_decorator(matched_items['call'][0]):
+                continue
+            callee = matched_items['call'][0].text.decode().split("(")[0]
+            name = callee.split(".")[-1]
+            for method, loops, _ in enclosing(matched_items['call'][0]):
+                profile = profiles[method]
+                calls[method][name] = None
+                profile['loop_calls'] += loops > 0
+                profile['io_calls'] += bool(BaseParser.IO.search(callee))
+                profile['recursive'] |= name == names[method]
+                profile['loop_collections'] += loops > 0 and bool(
+                    BaseParser.COLLECTIONS.match(name)
+                )
+        return Extract(
+            methods=[
+                method._replace(
+                    calls=tuple(method.calls),
+                    profile=tuple(method.profile.values()),
+                    statements=tuple(sorted(method.statements))
+                )
+                for method in methods.values()
+            ],
+            imports=self._imports(captures),
+            package=self._package(captures),
+            routes=self._routes(captures)
+        )
+
+    @staticmethod
+    def _merge(file, extract):
+        """
+        Merges extracted records into the file's internal dictionary.
+
+        Args:
+            file: The file the records were extracted from
+            extract: The extracted records
+        """
+        file.clear()
+        file.imports = extract.imports
+        file.package = extract.package
+        file.routes = extract.routes
+        for method in extract.methods:
+            file.add(Node.FileNode.MethodNode(
+                parent=file,
+                id=method.identifier,
+                params=method.parameters,
+                span=method.span,
+                decorator=method.decorator,
+                cls=method.cls,
+                calls=method.calls,
+                profile=method.profile,
+                statements=method.statements
+            ))
+
+    def _enclosing_class(self, node):
+        """
+        Retrieves the name of the class declaring a method.
+
+        Args:
+            node: The method's syntax node
+
+        Returns:
+            The class name, None for free functions
+        """
+        node = node.parent
+        while node and node.type not in self.CLASSES:
+            node = node.parent
+        return node.child_by_field_name('name').text.decode() if node else None
 
-    def parse_method_calls(self, method_node):
+    def parse_method_calls(self, method_node, depth=None, fanout=None,
+                           budget=None):
         """
         Creates a method trace beginning at the given method.
 
-        This utilises the created call graph and simply traverses it
-        through the use of a BFS algorithm.
+        This utilises the created call graph and traverses it over
+        interned method symbols, expanding the hottest method first.
+        The call sites recorded at extraction are used, so no method
+        is parsed again.
+
+        Callees and unbounded traces are memoised in the call graph,
+        which is shared by every endpoint until the index changes.
 
         Args:
             method_node: The method node from where to begin the trace
+            depth: The maximum number of calls to follow from the method
+            fanout: The maximum number of callees to follow per method
+            budget: The maximum number of methods in the trace
+
+        Returns:
+            Set of method nodes, unbounded limits are None
         """
-        def method_call(call):
-            return call.split("(")[0].split(".")[-1]
         if not method_node:
             return
-        fault_line = set()
-        queue = deque([method_node])
-        while queue:
-            node = queue.popleft()
-            fault_line.add(node)
-            tree = self.parser.parse(node.method.encode())
-            matches = self.queries['call'].matches(tree.root_node)
-            for match in matches:
-                call = method_call(match[1]['call'][0].text.decode())
-                if (call in node.parent.methods and
-                        node.parent.methods[call] not in fault_line):
-                    queue.append(node.parent.methods[call])
-        return fault_line
+        graph = self.graph
+        if depth is None and fanout is None and budget is None:
+            return {
+                graph.methods[symbol] for symbol in graph.reach(method_node)
+            }
+        graph.methods.setdefault(method_node.symbol, method_node)
+        seen = {method_node.symbol}
+        queue = [(-method_node.hotness, 0, 0, method_node.symbol)]
+        trace = set()
+        while queue and (budget is None or len(trace) < budget):
+            _, _, level, symbol = heappop(queue)
+            trace.add(graph.methods[symbol])
+            if depth is not None and level >= depth:
+                continue
+            callees = [
+                graph.methods[callee] for callee in graph.edges(symbol)
+                if callee not in seen
+            ]
+            callees.sort(key=lambda callee: callee.hotness, reverse=True)
+            for callee in callees[:fanout]:
+                seen.add(callee.symbol)
+                heappush(queue, (
+                    -callee.hotness, len(seen), level + 1, callee.symbol
+                ))
+        return trace
 
     def endpoint(self, files, endpoint_ref):
         """
         Given a label to the endpoint, this method seeks
-        to match on this endpoint through the use of fuzzy matching.
+        to match on this endpoint through the route table.
+
+        The route table of the indexed commit is used when there is one.
+        Fuzzy matching on the decorators is the fallback.
 
         Args:
             files: The list of files to search from
@@ -85,6 +636,11 @@ class BaseParser(ABC):
         Returns:
             The MethodNode that corresponds to the endpoint.
         """
+        routes = self.routes if self.commit else RouteTable.build(files)
+        method = routes.match(endpoint_ref)
+        if method:
+            return method
+
         ranked_methods = []
         for file in files:
             for method in file.methods.values():
@@ -95,30 +651,135 @@ class BaseParser(ABC):
         ranked_methods.sort(key=lambda method: method[1], reverse=True)
         return ranked_methods[0][0] if ranked_methods else None
 
+    def _package(self, captures):
+        """
+        Retrieves the package declared by a file, if the language has one.
+
+        Args:
+            captures: The file's query captures, by pattern kind
+
+        Returns:
+            The package name, None otherwise
+        """
+        return None
+
+    def extend_file_methods(self, files):
+        """
+        Traverses files to import the methods of the files they refer to.
+
+        The files are indexed by the names other files may refer to them
+        by, so that linking is a dictionary lookup per import.
+
+        Args:
+            files: The files to traverse
+        """
+        self._reset()
+        for file in files:
+            self._register(file)
+        for file in files:
+            self._link(file)
+
+    def _register(self, file):
+        """
+        Adds a parsed file to the index.
+
+        Args:
+            file: The file to add
+
+        Returns:
+            Paths of the files whose imports may now resolve to it
+        """
+        path = file.base.path
+        self.files[path] = file
+        self.routes.add(file)
+        affected = {path}
+        for key in self._keys(file):
+            self.names.setdefault(key, {})[path] = file
+            affected |= self.importers.get(key, set())
+        for key in self._references(file):
+            self.importers.setdefault(key, set()).add(path)
+        return affected
+
+    def _unregister(self, file):
+        """
+        Removes a file from the index.
+
+        Args:
+            file: The file to remove
+
+        Returns:
+            Paths of the files that imported it
+        """
+        path = file.base.path
+        for key in self._keys(file):
+            self.names[key].pop(path, None)
+            if not self.names[key]:
+                del self.names[key]
+        for key in self._references(file):
+            self.importers[key].discard(path)
+        for linked in self.links.pop(path, []):
+            self.dependents.get(linked, set()).discard(path)
+        self.routes.remove(path)
+        del self.files[path]
+        return self.dependents.pop(path, set())
+
+    def _link(self, file):
+        """
+        Links a file to the files it imports,
+        sharing their method tables rather than copying them.
+
+        Args:
+            file: The file to link
+        """
+        path = file.base.path
+        for linked in self.links.get(path, []):
+            self.dependents.get(linked, set()).discard(path)
+        self.links[path] = [
+            linked for linked in self._resolve(file) if linked != path
+        ]
+        file.links = [self.files[linked] for linked in self.links[path]]
+        for linked in self.links[path]:
+            self.dependents.setdefault(linked, set()).add(path)
+
+    @abstractmethod
+    def _imports(self, captures):   # pragma: no cover
+        pass
+
+    @abstractmethod
+    def _routes(self, captures):   # pragma: no cover
+        pass
+
+    @abstractmethod
+    def _keys(self, file):   # pragma: no cover
+        pass
+
+    @abstractmethod
+    def _references(self, file):   # pragma: no cover
+        pass
+
     @abstractmethod
-    def extend_file_methods(self, files):   # pragma: no cover
+    def _resolve(self, file):   # pragma: no cover
         pass
 
 
 class PythonParser(BaseParser):
     PY_LANGUAGE = Language(tspython.language())
+    CLASSES = {'class_definition'}
 
     def __init__(self):
         """
         Creates queries specific to the Python programming language
         """
+        super().__init__()
         self.parser = Parser(PythonParser.PY_LANGUAGE)
-        self.queries = {
-            'method_query': PythonParser.PY_LANGUAGE.query(
-                """
+        self.patterns = {
+            'method': """
                     (function_definition
                         name: (identifier) @identifier
                         parameters: (parameters) @parameters
                     ) @method
-                """
-            ),
-            'decorator_query': PythonParser.PY_LANGUAGE.query(
-                """
+                """,
+            'decorator': """
                     (decorated_definition
                         (decorator
                             (call
@@ -128,56 +789,314 @@ class PythonParser(BaseParser):
                                 parameters: (parameters) @parameters
                             )
                         ) @method
+                """,
+            'call': """(call function: (_) ) @call""",
+            'statement': """
+                    [
+                        (expression_statement)
+                        (return_statement)
+                        (if_statement)
+                        (for_statement)
+                        (while_statement)
+                        (try_statement)
+                        (with_statement)
+                        (raise_statement)
+                        (assert_statement)
+                        (delete_statement)
+                    ] @statement
+                """,
+            'loop': """
+                    [
+                        (for_statement)
+                        (while_statement)
+                        (list_comprehension)
+                        (set_comprehension)
+                        (dictionary_comprehension)
+                        (generator_expression)
+                    ] @loop
+                """,
+            'import': """
+                    [(import_statement) (import_from_statement)] @import
+                """,
+            'route': """
+                    (decorated_definition
+                        (decorator
+                            (call
+                                function: (attribute) @function
+                                arguments: (argument_list) @arguments))
+                        definition: (function_definition
+                            name: (identifier) @identifier)
+                    ) @method
+                """,
+            'prefix': """
+                    (assignment
+                        left: (identifier) @name
+                        right: (call
+                            arguments: (argument_list
+                                (keyword_argument
+                                    name: (identifier) @key
+                                    value: (string) @value))))
                 """
-            ),
-            'call': PythonParser.PY_LANGUAGE.query(
-                """(call function: (_) ) @call"""
-            ),
-            'import': PythonParser.PY_LANGUAGE.query(
-                """
-                    module_name: (dotted_name) @import
-                    name: (dotted_name) @import
-                """
-            )
         }
+        self.kinds = list(self.patterns)
+        self.query = PythonParser.PY_LANGUAGE.query(
+            "".join(self.patterns.values())
+        )
 
-    def extend_file_methods(self, files):
+    def _routes(self, captures):
+        """
+        Retrieves the routes declared by Flask and FastAPI decorators,
+        e.g. '@app.route', '@router.get' or '@blueprint.post'.
+        Router and blueprint prefixes declared in the file are applied.
+
+        Args:
+            captures: The file's query captures, by pattern kind
+
+        Returns:
+            List of (identifier, method span, HTTP verbs or None for any,
+            path) routes
+        """
+        prefixes = {}
+        for match in captures['prefix']:
+            if match['key'][0].text.decode() in ("prefix", "url_prefix"):
+                prefixes[match['name'][0].text.decode()] = (
+                    PythonParser._string(match['value'][0])
+                )
+
+        routes = []
+        for match in captures['route']:
+            function = match['function'][0]
+            owner = function.child_by_field_name('object').text.decode()
+            name = function.child_by_field_name('attribute').text.decode()
+            path, verbs = None, None
+            if name.upper() in RouteTable.VERBS:
+                verbs = (name.upper(),)
+            elif name not in ("route", "api_route"):
+                continue
+            for argument in match['arguments'][0].named_children:
+                if argument.type == 'string' and path is None:
+                    path = PythonParser._string(argument)
+                elif argument.type == 'keyword_argument':
+                    key = argument.child_by_field_name('name').text.decode()
+                    value = argument.child_by_field_name('value')
+                    if key in ("rule", "path") and value.type == 'string':
+                        path = PythonParser._string(value)
+                    elif key == "methods" and not verbs:
+                        verbs = tuple(
+                            PythonParser._string(verb).upper()
+                            for verb in value.named_children
+                            if verb.type == 'string'
+                        )
+            if path is not None:
+                method = match['method'][0]
+                routes.append((
+                    match['identifier'][0].text.decode(),
+                    (method.start_byte, method.end_byte),
+                    verbs,
+                    prefixes.get(owner, "") + path
+                ))
+        return routes
+
+    @staticmethod
+    def _string(node):
+        """
+        Retrieves the contents of a string literal.
+
+        Args:
+            node: The string syntax node
+
+        Returns:
+            The string contents, without quotes
+        """
+        return "".join(
+            child.text.decode()
+            for child in node.children
+            if child.type == 'string_content'
+        )
+
+    def _keys(self, file):
         """
-        Traverses files to import their methods.
+        Module names that an import statement may use to refer to a file.
+
+        Args:
+            file: The file to name
+
+        Returns:
+            Set of dotted module names for the file
+        """
+        return PythonParser._module_names(file.base.path)
+
+    def _references(self, file):
+        """
+        Module names that a file's imports may resolve to.
+
+        Args:
+            file: The importing file
+
+        Returns:
+            Set of dotted module names
+        """
+        references = set()
+        for imported in file.imports:
+            base, submodules = PythonParser._absolute(
+                imported, file.base.path
+            )
+            references.update(submodules)
+            if base:
+                references.add(base)
+        return references
+
+    def _resolve(self, file):
+        """
+        Traverses a file's imports to find the files it imports.
         This is only possible in Python if an an explicit import call is made.
 
+        Imports are resolved against the module path index built from the
+        repository layout, supporting packages and relative imports.
+
         Args:
-            files: The files to traverse
-        """  
-        file_repository = {file.base.path: file for file in files}
-        for file in files:
-            tree = self.parser.parse(file.raw_code.encode())
-            matches = self.queries['import'].matches(tree.root_node)
-            for match in matches:
-                for path, other_file in file_repository.items():
-                    if match[1]['import'][0].text.decode().replace(".", "/") in path:
-                        file.extend(other_file.methods)
+            file: The importing file
+
+        Returns:
+            Paths of the imported files
+        """
+        linked = {}
+        for imported in file.imports:
+            for name in PythonParser._imported_modules(
+                imported, file.base.path, self.names
+            ):
+                linked.update(self.names[name])
+        return list(linked)
+
+    def _imports(self, captures):
+        """
+        Retrieves the import statements of a file.
+
+        Args:
+            captures: The file's query captures, by pattern kind
+
+        Returns:
+            List of (module, names) pairs. The module is None for plain
+            'import' statements and may be relative, e.g. '..module'.
+        """
+        def dotted(node):
+            if node.type == 'aliased_import':
+                node = node.child_by_field_name('name')
+            return node.text.decode()
+
+        imports = []
+        for match in captures['import']:
+            statement = match['import'][0]
+            module = statement.child_by_field_name('module_name')
+            imports.append((
+                dotted(module) if module else None,
+                [
+                    dotted(node)
+                    for node in statement.children_by_field_name('name')
+                ]
+            ))
+        return imports
+
+    @staticmethod
+    def _module_names(path):
+        """
+        Module names that an import statement may use to refer to a file.
+
+        Every dotted suffix of the module path is included, as the source
+        root is unknown. Package initialisers are named after their package.
+
+        Args:
+            path: The path of the file in the repository
+
+        Returns:
+            Set of dotted module names for the file
+        """
+        parts = Path(path).with_suffix("").parts
+        if parts and parts[-1] == "__init__":
+            parts = parts[:-1]
+        return {".".join(parts[i:]) for i in range(len(parts))}
+
+    @staticmethod
+    def _absolute(imported, path):
+        """
+        Converts an import statement into absolute module names.
+
+        Args:
+            imported: The (module, names) pair of the import statement
+            path: The path of the importing file
+
+        Returns:
+            The imported-from module, or None for plain imports,
+            and the module names of the imported names
+        """
+        base, names = imported
+        if base is None:
+            return None, names
+        if base.startswith("."):
+            parts = Path(path).with_suffix("").parts
+            suffix = base.lstrip(".")
+            level = len(base) - len(suffix)
+            # Relative imports are anchored at the importing file's package.
+            anchor = list(parts[:max(len(parts) - level, 0)])
+            base = ".".join(anchor + ([suffix] if suffix else []))
+        return base, [f"{base}.{name}" if base else name for name in names]
+
+    @staticmethod
+    def _imported_modules(imported, path, modules):
+        """
+        Resolves an import statement to the repository modules it loads.
+
+        For 'from X import n', 'X.n' is used when 'n' is a submodule,
+        otherwise the import refers to a member of 'X'.
+
+        Args:
+            imported: The (module, names) pair of the import statement
+            path: The path of the importing file
+            modules: The module name to files index
+
+        Returns:
+            List of module names present in the index
+        """
+        base, submodules = PythonParser._absolute(imported, path)
+        resolved = [name for name in submodules if name in modules]
+        if base is not None and base in modules and (
+            len(resolved) < max(len(submodules), 1)
+        ):
+            resolved.append(base)
+        return resolved
 
 
 class JavaParser(BaseParser):
     JAVA_LANGUAGE = Language(tsjava.language())
+    CLASSES = {
+        'class_declaration',
+        'interface_declaration',
+        'enum_declaration',
+        'record_declaration'
+    }
+    MAPPINGS = {
+        "RequestMapping": None,
+        "GetMapping": "GET",
+        "PostMapping": "POST",
+        "PutMapping": "PUT",
+        "DeleteMapping": "DELETE",
+        "PatchMapping": "PATCH"
+    }
 
     def __init__(self):
         """
         Creates queries specific to the Java programming language
         """
+        super().__init__()
         self.parser = Parser(JavaParser.JAVA_LANGUAGE)
-        self.queries = {
-            'method_query': JavaParser.JAVA_LANGUAGE.query(
-                """
+        self.patterns = {
+            'method': """
                     (method_declaration
                             name: (identifier) @identifier
                             parameters: (formal_parameters) @parameters
                     ) @method
-                """
-            ),
-            'decorator_query': JavaParser.JAVA_LANGUAGE.query(
-                """
+                """,
+            'decorator': """
                     (method_declaration
                         (modifiers
                             (annotation
@@ -185,47 +1104,263 @@ class JavaParser(BaseParser):
                         name: (identifier) @identifier
                         parameters: (formal_parameters) @parameters
                     ) @method
-                """
-            ),
-            'call': JavaParser.JAVA_LANGUAGE.query(
-                """(method_invocation name: (identifier) @call)"""
-            ),
-            'import': JavaParser.JAVA_LANGUAGE.query(
-                """
+                """,
+            'call': """(method_invocation name: (identifier) @call)""",
+            'statement': """
+                    [
+                        (expression_statement)
+                        (local_variable_declaration)
+                        (return_statement)
+                        (if_statement)
+                        (for_statement)
+                        (enhanced_for_statement)
+                        (while_statement)
+                        (do_statement)
+                        (try_statement)
+                        (throw_statement)
+                        (switch_expression)
+                    ] @statement
+                """,
+            'loop': """
+                    [
+                        (for_statement)
+                        (enhanced_for_statement)
+                        (while_statement)
+                        (do_statement)
+                    ] @loop
+                """,
+            'import': """
                     (import_declaration (scoped_identifier) @import)
-                """
-            ),
-            'package': JavaParser.JAVA_LANGUAGE.query(
-                """
+                """,
+            'package': """
                     (package_declaration (scoped_identifier) @package)
+                """,
+            'route': """
+                    (method_declaration
+                        (modifiers
+                            [
+                                (annotation
+                                    name: (identifier) @annotation
+                                    arguments: (annotation_argument_list)
+                                        @arguments)
+                                (marker_annotation
+                                    name: (identifier) @annotation)
+                            ])
+                        name: (identifier) @identifier
+                    ) @method
                 """
-            )
         }
+        self.kinds = list(self.patterns)
+        self.query = JavaParser.JAVA_LANGUAGE.query(
+            "".join(self.patterns.values())
+        )
 
-    def extend_file_methods(self, files):
+    def _routes(self, captures):
+        """
+        Retrieves the routes declared by Spring mapping annotations,
+        prefixed by the enclosing class's '@RequestMapping'.
+
+        Args:
+            captures: The file's query captures, by pattern kind
+
+        Returns:
+            List of (identifier, method span, HTTP verbs or None for any,
+            path) routes
+        """
+        routes = []
+        for match in captures['route']:
+            annotation = match['annotation'][0].text.decode()
+            if annotation not in JavaParser.MAPPINGS:
+                continue
+            arguments = match.get('arguments', [None])[0]
+            paths, verbs = JavaParser._mapping(arguments)
+            if JavaParser.MAPPINGS[annotation]:
+                verbs = (JavaParser.MAPPINGS[annotation],)
+            method = match['method'][0]
+            for prefix in JavaParser._class_prefixes(method):
+                for path in paths:
+                    routes.append((
+                        match['identifier'][0].text.decode(),
+                        (method.start_byte, method.end_byte),
+                        verbs,
+                        prefix.rstrip("/") + "/" + path.lstrip("/")
+                    ))
+        return routes
+
+    @staticmethod
+    def _mapping(arguments):
+        """
+        Retrieves the paths and HTTP verbs of a mapping annotation.
+
+        Args:
+            arguments: The annotation's argument list node, if any
+
+        Returns:
+            List of paths, and the HTTP verbs or None for any
+        """
+        def strings(node):
+            if node.type == 'string_literal':
+                return ["".join(
+                    child.text.decode()
+                    for child in node.children
+                    if child.type == 'string_fragment'
+                )]
+            if node.type == 'element_value_array_initializer':
+                return [
+                    string
+                    for child in node.named_children
+                    for string in strings(child)
+                ]
+            return []
+
+        def fields(node):
+            if node.type == 'field_access':
+                return [node.child_by_field_name('field').text.decode()]
+            if node.type == 'element_value_array_initializer':
+                return [
+                    field
+                    for child in node.named_children
+                    for field in fields(child)
+                ]
+            return []
+
+        paths, verbs = [], None
+        for argument in arguments.named_children if arguments else []:
+            if argument.type == 'element_value_pair':
+                key = argument.child_by_field_name('key').text.decode()
+                value = argument.child_by_field_name('value')
+                if key in ("value", "path"):
+                    paths.extend(strings(value))
+                elif key == "method":
+                    verbs = tuple(fields(value))
+            else:
+                paths.extend(strings(argument))
+        return paths or [""], verbs
+
+    @staticmethod
+    def _class_prefixes(method):
+        """
+        Retrieves the paths mapped by the class enclosing a method.
+
+        Args:
+            method: The method declaration node
+
+        Returns:
+            List of path prefixes
         """
-        Traverses the list of files to import file methods if:
+        node = method.parent
+        while node and node.type != 'class_declaration':
+            node = node.parent
+        modifiers = next(
+            (child for child in node.children if child.type == 'modifiers'),
+            None
+        ) if node else None
+        for annotation in modifiers.named_children if modifiers else []:
+            name = annotation.child_by_field_name('name')
+            if name and name.text.decode() == "RequestMapping":
+                return JavaParser._mapping(
+                    annotation.child_by_field_name('arguments')
+                )[0]
+        return [""]
+
+    def _keys(self, file):
+        """
+        Names that an import statement may use to refer to a file,
+        including its package for same-package and wildcard access.
+
+        Args:
+            file: The file to name
+
+        Returns:
+            Set of fully-qualified names for the file
+        """
+        keys = JavaParser._qualified_names(file.base.path, file.package)
+        if file.package:
+            keys.add(("package", file.package))
+        return keys
+
+    def _references(self, file):
+        """
+        Names that a file's imports and package may resolve to.
+
+        Args:
+            file: The importing file
+
+        Returns:
+            Set of fully-qualified names
+        """
+        references = set(file.imports)
+        references.update(("package", name) for name in file.imports)
+        if file.package:
+            references.add(("package", file.package))
+        return references
+
+    def _resolve(self, file):
+        """
+        Traverses the index to import file methods if:
             - the two packages are the same
             - if an explicit import call had been made
 
         Args:
-            files: The files to traverse
+            file: The importing file
+
+        Returns:
+            Paths of the imported files
         """
-        file_repository = {file.base.path: file for file in files}
-        for file in files:
-            tree = self.parser.parse(file.raw_code.encode())
-            matches = self.queries['import'].matches(tree.root_node)
-            package = self.queries['package'].matches(tree.root_node)
-            for match in matches:
-                for path, other_file in file_repository.items():
-                    subtree = self.parser.parse(other_file.raw_code.encode())
-                    package_match = self.queries['package'].matches(
-                        subtree.root_node
-                    )
-                    if package:
-                        for p_match in package_match:
-                            if (p_match[1]['package'][0].text.decode() ==
-                                    package[0][1]['package'][0].text.decode()):
-                                file.extend(other_file.methods)
-                    if match[1]['import'][0].text.decode().replace(".", "/") in path:
-                        file.extend(other_file.methods)
+        linked = {}
+        if file.package:
+            linked.update(self.names[("package", file.package)])
+        for name in file.imports:
+            # Wildcard imports are captured without the asterisk,
+            # so they resolve against the package names.
+            linked.update(self.names.get(name, {}))
+            linked.update(self.names.get(("package", name), {}))
+        return list(linked)
+
+    def _imports(self, captures):
+        """
+        Retrieves the imported names of a file.
+
+        Args:
+            captures: The file's query captures, by pattern kind
+
+        Returns:
+            List of imported fully-qualified names
+        """
+        return [
+            match['import'][0].text.decode() for match in captures['import']
+        ]
+
+    def _package(self, captures):
+        """
+        Retrieves the package declared by a file.
+
+        Args:
+            captures: The file's query captures, by pattern kind
+
+        Returns:
+            The package name, None otherwise
+        """
+        package = captures['package']
+        return package[0]['package'][0].text.decode() if package else None
+
+    @staticmethod
+    def _qualified_names(path, package):
+        """
+        Names that an import statement may use to refer to a file.
+
+        Every dotted suffix of the file path is included, as the source
+        root is unknown, along with the name given by the file's package.
+
+        Args:
+            path: The path of the file in the repository
+            package: The package declared by the file, if any
+
+        Returns:
+            Set of fully-qualified names for the file
+        """
+        parts = Path(path).with_suffix("").parts
+        names = {".".join(parts[i:]) for i in range(len(parts))}
+        if package:
+            names.add(f"{package}.{parts[-1]}")
+        return names
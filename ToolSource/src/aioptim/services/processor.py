@@ -8,7 +8,7 @@ linked GitHub repository.
 """
 
 from __future__ import annotations
-from github import Github, Auth
+from github import Github, Auth, GithubException
 from pathlib import Path
 from dataclasses import dataclass
 from rapidfuzz import fuzz
@@ -20,6 +20,9 @@ from aioptim.utils.node import Node
 class GithubProcessor:
     """ Wrapper around the PyGitHub object """
 
+    # GitHub lists at most this many files in a comparison
+    COMPARE_FILES = 300
+
     access_token: str
     repository_name: str
     default_branch: str
@@ -52,28 +55,85 @@ class GithubProcessor:
                 "Repository with read & write permissions not found"
             )
 
-    def __getitem__(self, extension):
+    def __getitem__(self, key):
         """
         Retrieves files with a specific type of extension.
 
         Args:
-            extension: The file extension to search for
+            key: The file extension to search for, optionally with the
+                 SHA of the commit to read the files at,
+                 e.g. processor["py", sha]
 
         Returns:
             A list of files of the same extension type
         """
+        extension, ref = key if isinstance(key, tuple) else (key, None)
+        at = {"ref": ref} if ref else {}
         files = []
         repository = self.github.get_repo(self.repository_path)
-        contents = repository.get_contents("")
+        contents = repository.get_contents("", **at)
         while contents:
             file_content = contents.pop(0)
             if file_content.type == "dir":
                 contents.extend(
-                    repository.get_contents(file_content.path))
+                    repository.get_contents(file_content.path, **at))
             elif Path(file_content.path).suffix == "." + extension:
                 files.append(Node.FileNode(file_content))
         return files
 
+    def head(self):
+        """
+        Retrieves the latest commit on the deployment branch.
+
+        Returns:
+            The SHA of the commit
+        """
+        repository = self.github.get_repo(self.repository_path)
+        return repository.get_branch(self.default_branch).commit.sha
+
+    def diff(self, base, head, extension):
+        """
+        Retrieves the files with a specific type of extension
+        that changed between two commits.
+
+        Args:
+            base: The SHA of the earlier commit
+            head: The SHA of the later commit
+            extension: The file extension to search for
+
+        Raises:
+            LookupError: If head does not descend from base, e.g. after a
+                         force push, if base no longer exists, or if the
+                         comparison lists too many files to be complete
+
+        Returns:
+            The added or modified files, and the paths of deleted files
+        """
+        repository = self.github.get_repo(self.repository_path)
+        try:
+            comparison = repository.compare(base, head)
+        except GithubException as e:
+            raise LookupError(f"Could not compare {base} to {head}: {e}")
+        if comparison.status not in ("ahead", "identical"):
+            raise LookupError(f"{head} is {comparison.status} of {base}")
+        if len(comparison.files) >= GithubProcessor.COMPARE_FILES:
+            raise LookupError(f"Too many files changed since {base}")
+        changed, removed = [], []
+        for file in comparison.files:
+            if file.status == "renamed" and (
+                Path(file.previous_filename).suffix == "." + extension
+            ):
+                removed.append(file.previous_filename)
+            if Path(file.filename).suffix != "." + extension:
+                continue
+            if file.status == "removed":
+                removed.append(file.filename)
+            else:
+                changed.append(Node.FileNode(
+                    repository.get_contents(file.filename, ref=head)
+                ))
+        return changed, removed
+
     def update_file(self, method_node, new_code):
         """
         Updates the file in the remote repository.
@@ -0,0 +1,313 @@
+"""
+Pool of long-lived classifier worker processes.
+
+Inference is moved out of the scheduler's process, so that large
+classification batches neither stall the pipeline's I/O nor contend
+for its interpreter lock. Requests arriving close together are
+micro-batched into one inference run. The model weights are loaded
+once and shared read-only with every worker. Slow regions are localised by the
+workers too, so the scheduler's process never runs the model.
+"""
+from concurrent.futures import Future
+from itertools import count
+from threading import Lock, Thread
+from types import SimpleNamespace
+import queue
+import time
+import torch.multiprocessing as mp
+
+
+def _serve(classifier_type, options, model, requests, responses, window,
+           limit):
+    """
+    Serves classification and localisation requests inside a worker
+    process.
+
+    Args:
+        classifier_type: The classifier class
+        options: The classifier's keyword arguments
+        model: The shared model
+        requests: The queue of (ID, sources, share) requests, each source
+            a (method source, language, boundaries, regions) tuple. The
+            sources are localised at the share, or classified without one.
+        responses: The queue of (ID, results, error, metrics) responses,
+            the metrics being those recorded since the previous response
+        window: Seconds to wait for further requests to batch together
+        limit: The maximum number of methods batched together
+    """
+    classifier = classifier_type(**options)
+    classifier.load(model)
+
+    def respond(id, results, error=None):
+        metrics, classifier.metrics = classifier.metrics, {}
+        responses.put((id, results, error, metrics))
+
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        id, sources, share = request
+        if share is not None:
+            try:
+                respond(id, [
+                    classifier.localise(_node(*source), share)
+                    for source in sources
+                ])
+            except Exception as e:
+                respond(id, None, str(e))
+            continue
+        batch = [request]
+        deadline = time.monotonic() + window
+        while sum(len(sources) for _, sources, _ in batch) < limit:
+            try:
+                request = requests.get(
+                    timeout=max(0, deadline - time.monotonic())
+                )
+            except queue.Empty:
+                break
+            if request is None or request[2] is not None:
+                requests.put(request)
+                break
+            batch.append(request)
+
+        try:
+            verdicts = classifier.classify([
+                _node(*source)
+                for _, sources, _ in batch
+                for source in sources
+            ])
+        except Exception as e:
+            for id, _, _ in batch:
+                respond(id, None, str(e))
+            continue
+        start = 0
+        for id, sources, _ in batch:
+            respond(id, verdicts[start:start+len(sources)])
+            start += len(sources)
+
+
+def _node(method, language, boundaries, regions):
+    """
+    Rebuilds a code input from the source sent to a worker.
+
+    Args:
+        method: The method's source code
+        language: The file extension of the method's language
+        boundaries: The method's statement boundaries
+        regions: The method's statements
+
+    Returns:
+        The code input
+    """
+    return SimpleNamespace(
+        method=method, language=language, boundaries=boundaries,
+        regions=regions
+    )
+
+
+def _cores(affinity, worker, workers):
+    """
+    Divides the CPUs inference is pinned to between the workers, so that
+    workers do not contend for the same cores. Every worker shares the
+    CPUs when there are fewer CPUs than workers.
+
+    Args:
+        affinity: The CPUs inference is pinned to, if any
+        worker: The index of the worker
+        workers: The number of workers
+
+    Returns:
+        The CPUs the worker is pinned to, if any
+    """
+    if not affinity or len(affinity) < workers:
+        return affinity
+    return affinity[worker::workers]
+
+
+class ClassifierPool:
+    """
+    Worker processes classifying methods submitted from this process.
+    """
+    POLL = 1    # Seconds between checks that the workers are alive
+    # Per-worker readings, reported as the largest rather than summed
+    GAUGES = {"threads", "load_seconds", "warmup_seconds"}
+
+    def __init__(self, classifier, workers=2, window=0.01, limit=256):
+        """
+        Loads the model into shared memory and starts the workers, each
+        pinned to its share of the classifier's CPUs.
+
+        Args:
+            classifier: The classifier whose configuration the workers use
+            workers: The number of worker processes
+            window: Seconds a worker waits for further requests to batch
+            limit: The maximum number of methods batched together
+        """
+        context = mp.get_context("spawn")
+        self.requests = context.Queue()
+        self.responses = context.Queue()
+        self.futures = {}
+        self.ids = count()
+        self.lock = Lock()
+        self.metrics = {}
+        self.broken = False
+        self.closed = False
+        model = classifier.pretrained().share_memory()
+        options = {
+            "batch_size": classifier.batch_size,
+            "backend": classifier.backend_name,
+            "snapshot": classifier.snapshot,
+            "max_chunks": classifier.max_chunks,
+            "overlap": classifier.overlap,
+            "threads": classifier.threads,
+            "tokenizer_parallelism": classifier.tokenizer_parallelism,
+            "normalise": classifier.normalise
+        }
+        self.processes = [
+            context.Process(
+                target=_serve,
+                args=(
+                    type(classifier),
+                    dict(
+                        options,
+                        affinity=_cores(classifier.affinity, worker, workers)
+                    ),
+                    model,
+                    self.requests,
+                    self.responses,
+                    window,
+                    limit
+                ),
+                daemon=True
+            )
+            for worker in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+        self.receiver = Thread(target=self._receive, daemon=True)
+        self.receiver.start()
+
+    def submit(self, code_nodes, share=None):
+        """
+        Queues methods for classification, or for localisation of their
+        slow regions.
+
+        Args:
+            code_nodes: The code inputs to classify or localise
+            share: The share of the attribution a slow region must hold,
+                None classifies the code inputs
+
+        Returns:
+            Future of the list of (label, score) verdicts, or of the list
+            of slow regions when localising
+        """
+        future = Future()
+        with self.lock:
+            id = next(self.ids)
+            self.futures[id] = future
+        self.requests.put((id, [
+            (
+                node.method,
+                getattr(node, "language", None),
+                tuple(getattr(node, "boundaries", ())),
+                tuple(getattr(node, "regions", ()))
+            )
+            for node in code_nodes
+        ], share))
+        return future
+
+    def report(self):
+        """
+        Retrieves the metrics the workers recorded since the last report.
+        Counters are summed over the workers, while gauges such as the
+        thread count or the load time are the largest worker's reading.
+
+        Returns:
+            Dictionary of metric names to values
+        """
+        with self.lock:
+            report, self.metrics = self.metrics, {}
+        return report
+
+    @staticmethod
+    def merge(report, metrics):
+        """
+        Adds metrics to a report, summing counters and keeping the
+        largest reading of gauges.
+
+        Args:
+            report: The metrics to add to, updated in place
+            metrics: The metrics to add
+        """
+        for name, value in metrics.items():
+            if name in ClassifierPool.GAUGES:
+                report[name] = max(report.get(name, value), value)
+            else:
+                report[name] = report.get(name, 0) + value
+
+    def _receive(self):
+        """
+        Resolves the futures of the responses sent back by the workers,
+        and collects their metrics. If a worker stops unexpectedly, the
+        request it held is lost, so every pending future is failed and
+        the pool is marked broken.
+        """
+        while True:
+            try:
+                response = self.responses.get(timeout=ClassifierPool.POLL)
+            except queue.Empty:
+                if self.closed:
+                    return
+                self._check()
+                continue
+            if response is None:
+                return
+            id, results, error, metrics = response
+            with self.lock:
+                ClassifierPool.merge(self.metrics, metrics)
+                future = self.futures.pop(id, None)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(results)
+
+    def _check(self):
+        """
+        Fails the pending futures if a worker stopped unexpectedly.
+        """
+        stopped = [
+            process.exitcode for process in self.processes
+            if process.exitcode not in (None, 0)
+        ]
+        if not stopped:
+            return
+        self.broken = True
+        with self.lock:
+            futures, self.futures = self.futures, {}
+        for future in futures.values():
+            future.set_exception(RuntimeError(
+                f"A classifier worker stopped with exit code {stopped[0]}"
+            ))
+
+    def close(self):
+        """
+        Stops the workers once the queued requests are served. The workers
+        of a broken pool are terminated instead, as a stopped worker may
+        have left the queues unusable.
+        """
+        if self.broken:
+            self.requests.cancel_join_thread()
+            self.responses.cancel_join_thread()
+            for process in self.processes:
+                process.terminate()
+        else:
+            for _ in self.processes:
+                self.requests.put(None)
+        for process in self.processes:
+            process.join()
+        self.closed = True
+        if not self.broken:
+            self.responses.put(None)
+        self.receiver.join()
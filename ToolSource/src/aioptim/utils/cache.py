@@ -0,0 +1,118 @@
+"""
+Persistent cache of classifier verdicts.
+
+Verdicts are keyed by a hash of the normalised method source, with the
+model name and revision, so unchanged methods are not classified again
+between cycles and a new model invalidates the previous verdicts.
+"""
+from hashlib import sha256
+import os
+import sqlite3
+
+
+class ClassificationCache:
+    """
+    SQLite-backed mapping of method source hashes to verdicts.
+    """
+    PATH = 'classifier.db'
+
+    def __init__(self, path=None):
+        """
+        Opens the cache, creating it if it does not exist.
+
+        Args:
+            path: The database file, defaults to the configuration directory
+        """
+        self.path = path or ClassificationCache.get_abs_path()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS verdicts (
+                        digest TEXT,
+                        model TEXT,
+                        revision TEXT,
+                        label INTEGER,
+                        score REAL,
+                        PRIMARY KEY (digest, model, revision)
+                    )
+                """
+            )
+
+    @staticmethod
+    def get_abs_path():
+        """
+        Get the absolute value for the path of the cache.
+
+        Returns:
+            File path.
+        """
+        directory = os.path.dirname(os.path.abspath(__file__))
+        parent_directory = os.path.dirname(directory)
+        return os.path.join(
+            parent_directory, "config", ClassificationCache.PATH
+        )
+
+    @staticmethod
+    def digest(code):
+        """
+        Hashes method source code, ignoring differences in whitespace.
+
+        Args:
+            code: The method source code
+
+        Returns:
+            The hexadecimal digest
+        """
+        return sha256(" ".join(code.split()).encode()).hexdigest()
+
+    def get(self, digests, model, revision):
+        """
+        Retrieves the cached verdicts of a model revision.
+
+        Args:
+            digests: The digests to look up
+            model: The model name
+            revision: The model revision
+
+        Returns:
+            Dictionary of digest to (label, score) verdicts, for cached digests
+        """
+        digests = list(set(digests))
+        verdicts = {}
+        for i in range(0, len(digests), 500):
+            batch = digests[i:i+500]
+            rows = self.connection.execute(
+                f"""
+                    SELECT digest, label, score FROM verdicts
+                    WHERE model = ? AND revision = ?
+                    AND digest IN ({", ".join("?" * len(batch))})
+                """,
+                (model, revision, *batch)
+            )
+            for digest, label, score in rows:
+                verdicts[digest] = (label, score)
+        return verdicts
+
+    def put(self, verdicts, model, revision):
+        """
+        Stores verdicts of a model revision.
+        Verdicts of any other model or revision are invalidated.
+
+        Args:
+            verdicts: Dictionary of digest to (label, score) verdicts
+            model: The model name
+            revision: The model revision
+        """
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM verdicts WHERE model != ? OR revision != ?",
+                (model, revision)
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?)",
+                [
+                    (digest, model, revision, label, score)
+                    for digest, (label, score) in verdicts.items()
+                ]
+            )
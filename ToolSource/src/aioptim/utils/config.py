@@ -104,6 +104,7 @@ class Prompt(YAMLLoader):
         Useful for having a shared state for PromptKeys.
         """
         CODE_GEN = "code_generation"
+        REGION_GEN = "region_generation"
         DES_GEN = "description_generation"
         CJ_ANALYSER = "codejudge_analyse"
         CJ_SUMMARISE = "codejudge_summarise"
@@ -3,14 +3,54 @@ Node superclass to define Instana endpoint nodes, GitHub file nodes and
 method block nodes.
 """
 from dataclasses import dataclass
+from typing import NamedTuple
 import base64
-from typing import Union
+import sys
 from pathlib import Path
 
 
 class Node:
     """ Parent Node class. """
 
+    class SymbolTable:
+        """
+        Interns qualified method symbols to compact integer IDs.
+        """
+
+        def __init__(self):
+            """
+            Creates an empty symbol table.
+            """
+            self.ids = {}
+            self.symbols = []
+
+        def intern(self, symbol):
+            """
+            Retrieves the ID of a symbol, assigning the next ID to new symbols.
+
+            Args:
+                symbol: The (file, class, name, signature) qualified symbol
+
+            Returns:
+                The symbol's ID
+            """
+            if symbol not in self.ids:
+                self.ids[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            return self.ids[symbol]
+
+        def __getitem__(self, id):
+            """
+            Retrieves the qualified symbol of an ID.
+
+            Args:
+                id: The symbol's ID
+
+            Returns:
+                The (file, class, name, signature) qualified symbol
+            """
+            return self.symbols[id]
+
     @dataclass
     class EndpointNode:
         """
@@ -25,30 +65,198 @@ class Node:
         Node representing the GitHub file structure.
         """
 
-        @dataclass
         class MethodNode:
             """
             Node holding the inner code blocks from the file structure.
             A file consists of method nodes.
+
+            Text is not copied into the node. It is stored as byte ranges
+            into the parent file's buffer and decoded on access.
             """
-            parent: 'Node.FileNode'
-            id: str
-            params: str
-            method: str
-            decorator: Union[str, None] = None
+
+            class Profile(NamedTuple):
+                """
+                Cheap static signals of a method's cost.
+                """
+                nesting: int = 0
+                loop_calls: int = 0
+                io_calls: int = 0
+                statements: int = 0
+                recursive: bool = False
+                loop_collections: int = 0
+
+            __slots__ = (
+                "parent",
+                "id",
+                "cls",
+                "symbol",
+                "start",
+                "end",
+                "params_start",
+                "params_end",
+                "decorator_start",
+                "decorator_end",
+                "calls",
+                "profile",
+                "probability",
+                "statements",
+                "region",
+                "generated_code"
+            )
+
+            def __init__(self, parent, id, params, span, decorator=None,
+                         cls=None, calls=(), profile=(), statements=()):
+                """
+                Initialises the method from byte ranges into the parent's
+                buffer and interns its qualified symbol:
+                file, class, name and signature.
+
+                Args:
+                    parent: The file declaring the method
+                    id: The method name
+                    params: Byte range of the parameters
+                    span: Byte range of the method
+                    decorator: Byte range of the decorator arguments
+                    cls: The class declaring the method
+                    calls: Names of the methods called within the method
+                    profile: The static signals of the method's cost
+                    statements: Start byte, end byte and nesting depth of
+                        each statement
+                """
+                self.parent = parent
+                self.id = sys.intern(id)
+                self.cls = cls
+                self.start, self.end = span
+                self.params_start, self.params_end = params
+                self.decorator_start, self.decorator_end = (
+                    decorator or (None, None)
+                )
+                self.calls = tuple(sys.intern(call) for call in calls)
+                self.profile = Node.FileNode.MethodNode.Profile(*profile)
+                self.probability = None
+                self.statements = statements
+                self.region = None
+                self.generated_code = None
+                self.symbol = Node.SYMBOLS.intern(
+                    (self.parent.base.path, self.cls, self.id, self.params)
+                )
+
+            def _text(self, start, end):
+                """
+                Decodes a byte range of the parent file's buffer.
+
+                Args:
+                    start: The start of the range
+                    end: The end of the range
+
+                Returns:
+                    The decoded text
+                """
+                return str(self.parent.view[start:end], "utf-8")
+
+            @property
+            def method(self):
+                """ The method's source code """
+                return self._text(self.start, self.end)
+
+            @property
+            def params(self):
+                """ The method's parameters """
+                return self._text(self.params_start, self.params_end)
+
+            @property
+            def hotness(self):
+                """ Static estimate of the method's cost, from its profile """
+                profile = self.profile
+                return (
+                    4 * profile.nesting
+                    + 2 * profile.loop_calls
+                    + 3 * profile.io_calls
+                    + 4 * profile.recursive
+                    + 2 * profile.loop_collections
+                )
+
+            @property
+            def language(self):
+                """ The file extension of the method's language """
+                return self.parent.language
+
+            @property
+            def regions(self):
+                """
+                The method's statements, as (start, end, nesting depth)
+                with character offsets into the method
+                """
+                code = self.parent.view[self.start:self.end]
+                single_byte = len(self.method) == len(code)
+
+                def offset(byte):
+                    if single_byte:
+                        return byte - self.start
+                    return len(str(code[:byte - self.start], "utf-8"))
+
+                return tuple(
+                    (offset(start), offset(end), depth)
+                    for start, end, depth in self.statements
+                )
+
+            @property
+            def boundaries(self):
+                """
+                The statement boundaries the method can be chunked on,
+                as (character offset into the method, nesting depth)
+                """
+                return tuple(
+                    (start, depth) for start, _, depth in self.regions
+                )
+
+            def context(self, start, end):
+                """
+                Retrieves the lines enclosing a region of the method: the
+                method's header, up to its first statement, and the first
+                line of each statement enclosing the region.
+
+                Args:
+                    start: The character offset of the region's start
+                    end: The character offset of the region's end
+
+                Returns:
+                    The enclosing lines
+                """
+                code = self.method
+                regions = self.regions
+                header = code.rfind(
+                    "\n", 0, min((region[0] for region in regions), default=0)
+                )
+                lines = {
+                    0: code[:header] if header > 0 else code.split("\n")[0]
+                }
+                for region_start, region_end, _ in regions:
+                    if region_start < start and region_end >= end:
+                        first = code.rfind("\n", 0, region_start) + 1
+                        last = code.find("\n", region_start)
+                        lines[first] = code[first:last if last >= 0 else None]
+                return "\n".join(lines[first] for first in sorted(lines))
+
+            @property
+            def decorator(self):
+                """ The method's decorator arguments, if any """
+                if self.decorator_start is None:
+                    return None
+                return self._text(self.decorator_start, self.decorator_end)
 
             def __hash__(self):
                 """
-                Hash the node based on the method signature
+                Hash the node based on the qualified symbol
 
                 Returns:
                     The method's hash
                 """
-                return hash((self.id, self.params))
+                return hash(self.symbol)
 
             def __eq__(self, comp):
                 """
-                Check the equality of a method, based on the method signature.
+                Check the equality of a method, based on the qualified symbol.
 
                 Args:
                     comp: The method node to compare
@@ -57,38 +265,93 @@ class Node:
                     True if equal, False otherwise
                 """
                 return (isinstance(comp, Node.FileNode.MethodNode) and
-                        self.id == comp.id and
-                        self.params == comp.params)
+                        self.symbol == comp.symbol)
 
         def __init__(self, base_file):
             """
-            Initialises the file structure based on the 
+            Initialises the file structure based on the
             GitHub file, the file's code and empty set of methods.
 
+            The code is held once, as the encoded buffer that
+            method nodes refer into.
+
             Args:
                 base_file: GitHub-fetched file, to extend.
             """
             self.base = base_file
             self.language = Path(base_file.path).suffix.replace(".", "")
-            self.raw_code = base64.b64decode(self.base.content).decode()
+            self.buffer = base64.b64decode(self.base.content)
+            self.view = memoryview(self.buffer)
             self.methods = {}
+            self.named = {}
+            self.links = []
+            self.imports = []
+            self.package = None
+            self.routes = []
+
+        @property
+        def raw_code(self):
+            """ The file's decoded source code """
+            return str(self.view, "utf-8")
+
+        def add(self, method):
+            """
+            Adds one of the file's own methods.
+
+            Args:
+                method: The method node to add
+            """
+            if method.symbol in self.methods:
+                self.named[method.id].remove(self.methods[method.symbol])
+            self.methods[method.symbol] = method
+            self.named.setdefault(method.id, []).append(method)
+
+        def clear(self):
+            """
+            Removes the file's own methods and links.
+            """
+            self.methods.clear()
+            self.named.clear()
+            self.links.clear()
 
+        def get(self, name):
+            """
+            Retrieves the file's own methods with a given name.
 
-            """ Extends the methods of the current file.
+            Args:
+                name: The method name
 
-                This is most often for the processing of import statements.
+            Returns:
+                List of method nodes
+            """
+            return self.named.get(name, [])
+
+        def resolve(self, name):
+            """
+            Retrieves the methods a call by name refers to.
+            The file's own methods take precedence over imported methods.
 
             Args:
-                New methods to append to current structure
+                name: The method name
+
+            Returns:
+                List of method nodes
             """
+            return self.get(name) or [
+                method for file in self.links for method in file.get(name)
+            ]
 
-        def extend(self, new_methods):
+        def extend(self, file):
             """
             Extends the methods of the current file.
-            When processing import statements, the file's method list
-            is extended.
+            When processing import statements, the file is linked to the
+            imported file, whose method table is shared rather than copied.
 
             Args:
-                new_methods: The list of new methods to extend the file.
+                file: The imported file.
             """
-            self.methods.update(new_methods)
+            if file is not self and file not in self.links:
+                self.links.append(file)
+
+
+Node.SYMBOLS = Node.SymbolTable()
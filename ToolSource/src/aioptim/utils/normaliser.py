@@ -0,0 +1,174 @@
+"""
+Normalises source code before it is tokenised for the classifier.
+
+Comments and docstrings are stripped with tree-sitter, blank lines are
+dropped and runs of whitespace are collapsed, so that the token window
+is spent on code. The same normalisation is applied when the classifier
+is trained and when it classifies.
+"""
+from bisect import bisect_right
+from tree_sitter import Language, Parser
+from typing import NamedTuple
+import re
+import tree_sitter_java as tsjava
+import tree_sitter_python as tspython
+
+
+class Normalised(NamedTuple):
+    """
+    Normalised source code, with the position each of its words had in
+    the original code.
+    """
+    code: str
+    pieces: tuple = ()
+
+    @staticmethod
+    def unchanged(code):
+        """
+        Wraps source code that is left as it is.
+
+        Args:
+            code: The source code
+
+        Returns:
+            The code, with every offset mapping to itself
+        """
+        return Normalised(code, ((0, 0, len(code)),))
+
+    def position(self, offset):
+        """
+        Maps a character offset of the original code into the normalised
+        code. Offsets into stripped text map to the end of the preceding
+        code.
+
+        Args:
+            offset: The character offset into the original code
+
+        Returns:
+            The character offset into the normalised code
+        """
+        index = bisect_right(self.pieces, (offset, float("inf"))) - 1
+        if index < 0:
+            return 0
+        original, normalised, length = self.pieces[index]
+        return normalised + min(offset - original, length)
+
+    def origin(self, position):
+        """
+        Maps a character offset of the normalised code back into the
+        original code. Offsets into inserted whitespace map to the end of
+        the preceding code.
+
+        Args:
+            position: The character offset into the normalised code
+
+        Returns:
+            The character offset into the original code
+        """
+        index = bisect_right(
+            self.pieces, position, key=lambda piece: piece[1]
+        ) - 1
+        if index < 0:
+            return 0
+        original, normalised, length = self.pieces[index]
+        return original + min(position - normalised, length)
+
+
+class Normaliser:
+    """
+    Strips comments, docstrings and redundant whitespace from source code.
+    """
+    LANGUAGES = {
+        "py": (
+            Language(tspython.language()),
+            """
+                [
+                    (comment) @strip
+                    (block . (expression_statement (string) @strip))
+                    (module . (expression_statement (string) @strip))
+                ]
+            """
+        ),
+        "java": (
+            Language(tsjava.language()),
+            "[(line_comment) (block_comment)] @strip"
+        )
+    }
+    # Indentation is kept where it is significant
+    INDENTED = {"py"}
+    WORD = re.compile(r"\S+")
+
+    def __init__(self):
+        """
+        Creates the parsers and queries of the supported languages.
+        """
+        self.parsers = {
+            language: (Parser(grammar), grammar.query(query))
+            for language, (grammar, query) in Normaliser.LANGUAGES.items()
+        }
+
+    def normalise(self, code, language=None):
+        """
+        Normalises source code. Code of an unsupported language only has
+        its whitespace collapsed.
+
+        Args:
+            code: The source code
+            language: The file extension of the code's language
+
+        Returns:
+            The normalised code
+        """
+        masked = self._mask(code, language)
+        lines, pieces, length = [], [], 0
+        for line in re.finditer(r"[^\n]+", masked):
+            words = list(Normaliser.WORD.finditer(line.group()))
+            if not words:
+                continue
+            if lines:
+                length += 1
+            indent = (
+                " " * words[0].start() if language in Normaliser.INDENTED
+                else ""
+            )
+            parts, length = [indent], length + len(indent)
+            for word in words:
+                if len(parts) > 1:
+                    parts.append(" ")
+                    length += 1
+                pieces.append(
+                    (line.start() + word.start(), length, len(word.group()))
+                )
+                parts.append(word.group())
+                length += len(word.group())
+            lines.append("".join(parts))
+        return Normalised("\n".join(lines), tuple(pieces))
+
+    def _mask(self, code, language):
+        """
+        Blanks out the comments and docstrings of source code, keeping
+        its line breaks and the offsets of the remaining code.
+
+        Args:
+            code: The source code
+            language: The file extension of the code's language
+
+        Returns:
+            The masked source code
+        """
+        if language not in self.parsers:
+            return code
+        parser, query = self.parsers[language]
+        encoded = code.encode()
+        single_byte = len(encoded) == len(code)
+        characters = list(code)
+        for nodes in query.captures(parser.parse(encoded).root_node).values():
+            for node in nodes:
+                start, end = node.start_byte, node.end_byte
+                if not single_byte:
+                    start = len(encoded[:start].decode(errors="ignore"))
+                    end = len(encoded[:end].decode(errors="ignore"))
+                for i in range(start, end):
+                    if characters[i] != "\n":
+                        characters[i] = " "
+        return "".join(characters)
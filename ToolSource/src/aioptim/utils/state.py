@@ -9,7 +9,8 @@ and deep learning code classifier.
     "Pythonic way to delete variable from self if it exists in a list"
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from typing import Union
 from aioptim.services.instana import IBM
 from aioptim.services.generator import Generator
 from aioptim.services.processor import GithubProcessor
@@ -30,23 +31,25 @@ class State:
     classifier: Classifier
     delay: int
     threshold: int
+    depth: Union[int, None] = None
+    fanout: Union[int, None] = None
+    budget: Union[int, None] = None
+    top_k: Union[int, None] = None
+    confidence: Union[float, None] = None
+    region_share: Union[float, None] = None
 
     def reset(self):
         """
         Resets the fields of the State object.
 
-        Added fields are removed, except the original attributes:
-        IBM, Generator, Processor, Classifier, delay and threshold.
+        Added fields are removed, except the declared attributes:
+        IBM, Generator, Processor, Classifier, delay, threshold,
+        the fault line limits, the slow code limits and the region share.
             [1]
         """
+        declared = {field.name for field in fields(self)}
         attribs = filter(
-            lambda attribute: attribute not in ["ibm",
-                                                "generator",
-                                                "processor",
-                                                "classifier",
-                                                "delay",
-                                                "threshold"
-                                                ],
+            lambda attribute: attribute not in declared,
             self.__dict__
         )
         for attrib in list(attribs):
@@ -1,4 +1,5 @@
-from aioptim.cli.main import start, store_params
+from aioptim.cli.main import app, start, store_params
+from typer.testing import CliRunner
 from unittest.mock import patch
 from aioptim.utils.config import Config
 from unittest.mock import MagicMock
@@ -15,6 +16,16 @@ def test_start():
                 assert mock_schedule.call_args[0][0] == delay
                 assert mock_schedule.call_args[0][1] == threshold
                 assert mock_schedule.call_args[0][2].id == id
+                limits = mock_schedule.call_args.kwargs
+                assert limits["depth"] is limits["fanout"] is None
+                assert limits["budget"] is None
+
+
+def test_start_overlap_out_of_range():
+    with patch("aioptim.cli.main.schedule_service") as mock_schedule:
+        result = CliRunner().invoke(app, ["start", "-overlap", "225"])
+        assert result.exit_code != 0
+        mock_schedule.assert_not_called()
 
 
 def test_setup():
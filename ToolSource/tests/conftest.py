@@ -0,0 +1,19 @@
+from transformers import RobertaConfig, RobertaForSequenceClassification
+import pytest
+import torch
+
+
+@pytest.fixture(scope="session")
+def tiny_model():
+    def build(vocab_size=100):
+        torch.manual_seed(0)
+        return RobertaForSequenceClassification(RobertaConfig(
+            vocab_size=vocab_size,
+            hidden_size=32,
+            num_hidden_layers=2,
+            num_attention_heads=2,
+            intermediate_size=64,
+            max_position_embeddings=514,
+            pad_token_id=1
+        ))
+    return build
@@ -0,0 +1,44 @@
+from aioptim.services.backends import (
+    TorchBackend,
+    QuantisedBackend,
+    OnnxBackend,
+    parity
+)
+import pytest
+import torch
+
+
+@pytest.fixture
+def batches():
+    input_ids = torch.randint(3, 100, (4, 12))
+    input_ids[:, 0], input_ids[2:, 8:] = 0, 1
+    return [(input_ids, (input_ids != 1).long())]
+
+
+def test_torch_backend(tiny_model, batches):
+    backend = TorchBackend(tiny_model())
+    logits = backend(*batches[0])
+    assert logits.shape == (4, 2)
+    assert parity(backend, backend, batches) == (1.0, 0.0)
+
+
+def test_quantised_backend(tiny_model, batches):
+    reference = TorchBackend(tiny_model())
+    quantised = QuantisedBackend(tiny_model())
+    assert quantised(*batches[0]).shape == (4, 2)
+    assert parity(reference, quantised, batches)[1] < 0.1
+
+
+def test_onnx_backend(tiny_model, batches):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("onnx")
+    reference = TorchBackend(tiny_model())
+    exported = OnnxBackend(tiny_model())
+    assert parity(reference, exported, batches) == pytest.approx(
+        (1.0, 0.0), abs=1e-4
+    )
+
+
+def test_parity_empty(tiny_model):
+    backend = TorchBackend(tiny_model())
+    assert parity(backend, backend, []) == (1.0, 0.0)
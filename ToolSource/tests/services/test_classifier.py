@@ -1,6 +1,10 @@
 import pytest
 from aioptim.services.classifier import Classifier
-from unittest.mock import MagicMock
+from aioptim.utils.cache import ClassificationCache
+from aioptim.utils.node import Node
+from types import SimpleNamespace
+from unittest.mock import MagicMock, PropertyMock, patch
+import os
 
 
 @pytest.fixture
@@ -59,16 +63,6 @@ def long_snippet():
     return code_node
 
 
-def test_valid_pred_to_label():
-    assert Classifier.Label.pred_to_label('LABEL_0') == Classifier.Label.FAST
-    assert Classifier.Label.pred_to_label('LABEL_1') == Classifier.Label.SLOW
-
-
-def test_invalid_pred_to_label():
-    assert Classifier.Label.pred_to_label('') == Classifier.Label.ERR
-    assert Classifier.Label.pred_to_label(None) == Classifier.Label.ERR
-
-
 def test_classify_short_code_snippet(classifier, short_snippet):
     result = classifier(short_snippet)
     if result:
@@ -77,6 +71,244 @@ def test_classify_short_code_snippet(classifier, short_snippet):
         assert True
 
 
+def test_classify_batched(short_snippet, long_snippet):
+    snippets = [short_snippet, long_snippet] * 3
+    batched = Classifier(batch_size=4)(*snippets)
+    unbatched = Classifier(batch_size=1)(*snippets)
+    assert [snippets.index(node) for node in batched] == [
+        snippets.index(node) for node in unbatched
+    ]
+
+
+def test_classify_cached(tmp_path, short_snippet, long_snippet):
+    classifier = Classifier(
+        cache=ClassificationCache(str(tmp_path / "classifier.db"))
+    )
+    result = classifier(short_snippet, long_snippet)
+    with patch.object(Classifier, "classify") as mock_classify:
+        assert classifier(short_snippet, long_snippet) == result
+        mock_classify.assert_not_called()
+
+
+def test_lazy_loading():
+    with patch(
+        "aioptim.services.classifier.AutoModelForSequenceClassification"
+    ) as mock_model:
+        classifier = Classifier()
+        mock_model.from_pretrained.assert_not_called()
+        assert not classifier.metrics
+
+
+def test_snapshot_loading(tmp_path):
+    with patch(
+        "aioptim.services.classifier.AutoModelForSequenceClassification"
+    ) as mock_model, patch(
+        "aioptim.services.classifier.AutoTokenizer"
+    ) as mock_tokenizer, patch.object(Classifier, "predict"):
+        Classifier(snapshot=str(tmp_path)).load()
+        mock_model.from_pretrained.assert_called_once_with(
+            str(tmp_path), local_files_only=True
+        )
+        mock_tokenizer.from_pretrained.assert_called_once_with(
+            str(tmp_path), local_files_only=True
+        )
+
+
+def test_snapshot_revision(tmp_path):
+    (tmp_path / "config.json").write_text("{}")
+    weights = tmp_path / "model.safetensors"
+    weights.write_bytes(b"old")
+    config = SimpleNamespace(name_or_path=str(tmp_path))
+    with patch.object(Classifier, "pretrained", return_value=config):
+        before = Classifier(snapshot=str(tmp_path)).revision
+        modified = os.stat(tmp_path).st_mtime_ns
+        weights.write_bytes(b"new weights")
+        assert os.stat(tmp_path).st_mtime_ns == modified
+        after = Classifier(snapshot=str(tmp_path)).revision
+        assert after != before
+        (tmp_path / "notes.txt").write_text("unrelated")
+        assert Classifier(snapshot=str(tmp_path)).revision == after
+
+
+def test_load_metrics(classifier):
+    classifier.load()
+    assert set(classifier.metrics) == {
+        "threads", "load_seconds", "warmup_seconds"
+    }
+
+
+def test_thread_settings(tmp_path):
+    with patch(
+        "aioptim.services.classifier.AutoModelForSequenceClassification"
+    ), patch(
+        "aioptim.services.classifier.AutoTokenizer"
+    ), patch.object(Classifier, "predict"), patch(
+        "aioptim.services.classifier.torch.set_num_threads"
+    ) as mock_threads, patch(
+        "aioptim.services.classifier.os.sched_setaffinity", create=True
+    ) as mock_affinity, patch.dict(os.environ):
+        Classifier(
+            snapshot=str(tmp_path),
+            threads=2,
+            tokenizer_parallelism=False,
+            affinity=[0, 1]
+        ).load()
+        mock_threads.assert_called_once_with(2)
+        mock_affinity.assert_called_once_with(0, (0, 1))
+        assert os.environ["TOKENIZERS_PARALLELISM"] == "false"
+
+
+def test_thread_settings_delegated_to_workers(tmp_path):
+    with patch(
+        "aioptim.services.classifier.AutoModelForSequenceClassification"
+    ), patch(
+        "aioptim.services.classifier.AutoTokenizer"
+    ), patch.object(Classifier, "predict"), patch(
+        "aioptim.services.classifier.torch.set_num_threads"
+    ) as mock_threads, patch(
+        "aioptim.services.classifier.os.sched_setaffinity", create=True
+    ) as mock_affinity, patch.dict(os.environ):
+        os.environ.pop("TOKENIZERS_PARALLELISM", None)
+        Classifier(
+            snapshot=str(tmp_path), workers=2, affinity=[0, 1]
+        ).load()
+        mock_threads.assert_not_called()
+        mock_affinity.assert_not_called()
+        assert "TOKENIZERS_PARALLELISM" not in os.environ
+
+
+def test_buckets():
+    chunks = [[1] * 5, [1], [1] * 3, [1] * 2, [1] * 4]
+    assert Classifier.buckets(chunks, 2) == [[1, 3], [2, 4], [0]]
+    assert Classifier.buckets([], 2) == []
+
+
+def test_report_padding_efficiency():
+    classifier = Classifier()
+    classifier.metrics.update(tokens=30, padded_tokens=40)
+    assert classifier.report()["padding_efficiency"] == 0.75
+    assert classifier.report() == {}
+
+
+def test_short_circuit_trivial_methods():
+    profile = Node.FileNode.MethodNode.Profile
+    trivial = MagicMock(profile=profile(statements=1))
+    looping = MagicMock(profile=profile(nesting=1, statements=2))
+    classifier = Classifier()
+    with patch.object(
+        Classifier, "classify", return_value=[(Classifier.Label.SLOW, 1.0)]
+    ) as mock_classify:
+        assert classifier(trivial, looping) == [looping]
+        mock_classify.assert_called_once_with([looping])
+    assert classifier.report() == {"short_circuited": 1}
+
+
+def test_slow_probability(short_snippet, long_snippet):
+    classifier = Classifier()
+    with patch.object(Classifier, "classify", return_value=[
+        (Classifier.Label.FAST, 0.2), (Classifier.Label.SLOW, 0.8)
+    ]):
+        assert classifier(short_snippet, long_snippet) == [long_snippet]
+    assert long_snippet.probability == 0.8
+
+
+@pytest.mark.parametrize("cuts, overlap, expected", [
+    ({}, 0, [(0, 4), (4, 8), (8, 10)]),
+    ({3: 0, 4: 1, 7: 0}, 0, [(0, 3), (3, 7), (7, 10)]),
+    ({1: 0, 3: 1}, 0, [(0, 3), (3, 7), (7, 10)]),
+    ({}, 1, [(0, 4), (3, 7), (6, 10)]),
+    ({3: 0, 6: 0}, 2, [(0, 3), (1, 5), (3, 6), (4, 8), (6, 10)]),
+])
+def test_split(cuts, overlap, expected):
+    assert Classifier.split(10, cuts, 4, overlap) == expected
+    assert Classifier.split(0, cuts, 4, overlap) == [(0, 0)]
+
+
+@pytest.mark.parametrize("overlap", [-1, Classifier.TOKEN_MAX // 2])
+def test_overlap_out_of_range(overlap):
+    with pytest.raises(ValueError):
+        Classifier(overlap=overlap)
+
+
+@pytest.mark.parametrize("probabilities, total, expected", [
+    ([], 1, 1),
+    ([], 4, 2),
+    ([0.9, 0.1], 4, 1),
+    ([0.9, 0.8], 3, 0),
+    ([0.1, 0.1], 3, 0),
+])
+def test_undecided(probabilities, total, expected):
+    assert Classifier.undecided(probabilities, total) == expected
+
+
+def test_classify_early_termination(long_snippet):
+    classifier = Classifier(max_chunks=6)
+    classifier._backend = classifier._tokenizer = MagicMock()
+    classifier._tokenizer.return_value = {
+        "input_ids": [1] * (Classifier.TOKEN_MAX * 10)
+    }
+    with patch.object(
+        Classifier, "predict", side_effect=lambda chunks: [0.9] * len(chunks)
+    ) as mock_predict:
+        [(label, score)] = classifier.classify([long_snippet])
+        assert label == Classifier.Label.SLOW
+        assert score == pytest.approx(0.9)
+        assert [
+            len(call.args[0]) for call in mock_predict.call_args_list
+        ] == [3, 1]
+    assert classifier.report() == {"chunks_skipped": 6}
+
+
+def test_localise():
+    code_node = MagicMock(regions=((10, 50, 0), (20, 40, 1), (25, 30, 2)))
+    classifier = Classifier()
+    with patch.object(Classifier, "attribute", return_value=[
+        (0, 5, 0.1), (21, 24, 0.3), (26, 29, 0.4), (45, 50, 0.2)
+    ]):
+        assert classifier.localise(code_node) == (20, 40)
+        assert classifier.localise(code_node, share=0.4) == (25, 30)
+        assert classifier.localise(code_node, share=0.95) is None
+    assert classifier.localise(MagicMock(regions=())) is None
+
+
+def test_normalisation_optional():
+    code_node = SimpleNamespace(
+        method="def f():\n    # note\n    return 1\n", language="py"
+    )
+    tokenizer = MagicMock(is_fast=False, return_value={"input_ids": [1]})
+    with patch.object(
+        Classifier, "tokenizer", new_callable=PropertyMock,
+        return_value=tokenizer
+    ):
+        assert Classifier()._encode(code_node)[0].code == code_node.method
+        normalised = Classifier(normalise=True)._encode(code_node)[0].code
+        assert "# note" not in normalised
+
+
+@pytest.mark.parametrize("options, model", [
+    ({}, f"{Classifier.MODEL_NAME}:torch"),
+    ({"normalise": True}, f"{Classifier.MODEL_NAME}:torch:normalised"),
+    ({"max_chunks": 4}, f"{Classifier.MODEL_NAME}:torch:chunks=4"),
+    ({"overlap": 32}, f"{Classifier.MODEL_NAME}:torch:overlap=32"),
+    (
+        {"normalise": True, "max_chunks": 1, "overlap": 8},
+        f"{Classifier.MODEL_NAME}:torch:normalised:chunks=1:overlap=8"
+    )
+])
+def test_cache_key_settings(options, model):
+    cache = MagicMock()
+    cache.get.return_value = {}
+    classifier = Classifier(cache=cache, **options)
+    with patch.object(
+        Classifier, "revision", new_callable=PropertyMock, return_value="r"
+    ), patch.object(
+        Classifier, "classify", return_value=[(Classifier.Label.SLOW, 0.9)]
+    ):
+        classifier(MagicMock(method="def f():\n    return 1\n"))
+    assert cache.get.call_args.args[1:] == (model, "r")
+    assert cache.put.call_args.args[1:] == (model, "r")
+
+
 def test_classify_long_code_snippet(classifier, long_snippet):
     result = classifier(long_snippet)
     if result:
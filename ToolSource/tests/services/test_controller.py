@@ -1,12 +1,14 @@
 import pytest
 from prefect.testing.utilities import prefect_test_harness
 import logging
+import base64
 from unittest.mock import patch, MagicMock, call
 from aioptim.services.parser import PythonParser
 from aioptim.utils.node import Node
 from aioptim.services.controller import (
     schedule_service,
     service,
+    index_repository,
     endpoints,
     fault_line,
     slow_code,
@@ -56,18 +58,17 @@ def py_raw_code():
 
 @pytest.fixture
 def py_file_node(py_raw_code):
-    file = MagicMock()
-    file.raw_code = py_raw_code
-    file.methods = {}
-    file.base.path = "src/aioptim/module"
-    file.extend = lambda new_methods: file.methods.update(new_methods)
-    return file
+    base = MagicMock()
+    base.path = "src/aioptim/module"
+    base.content = base64.b64encode(py_raw_code.encode())
+    return Node.FileNode(base)
 
 
 @pytest.fixture
 def state():
     state = MagicMock()
     state.reset_return_value = True
+    state.top_k = state.confidence = None
     return state
 
 
@@ -122,9 +123,93 @@ def test_fault_line(state, py_file_node):
         )
     ]
 
-    state.processor = {"py": [py_file_node]}
+    state.processor.head.return_value = "head"
+    state.processor.__getitem__.side_effect = {("py", "head"): [py_file_node]}.get
+    state.depth, state.fanout, state.budget = None, None, None
     fault_line(state)
     assert state.fault_line
+    if len(state.fault_line) > 1:
+        state.classifier.submit.assert_called_once()
+
+
+def test_fault_line_budget(state, py_file_node):
+    state.endpoints = [
+        Node.EndpointNode(
+            "label",
+            "pythonRuntimePlatform",
+            5
+        )
+    ]
+    state.processor.head.return_value = "head"
+    state.processor.__getitem__.side_effect = {("py", "head"): [py_file_node]}.get
+    state.depth, state.fanout, state.budget = 2, 4, 8
+    with patch.object(
+        PythonParser, "parse_method_calls", return_value=set()
+    ) as mock_trace:
+        fault_line(state)
+        assert mock_trace.call_args.kwargs == {
+            "depth": 2, "fanout": 4, "budget": 8
+        }
+
+
+def test_fault_line_submits_new_methods_only(state, py_file_node):
+    state.endpoints = [
+        Node.EndpointNode("label", "pythonRuntimePlatform", 5),
+        Node.EndpointNode("label", "pythonRuntimePlatform", 5)
+    ]
+    state.processor.head.return_value = "head"
+    state.processor.__getitem__.side_effect = {
+        ("py", "head"): [py_file_node]
+    }.get
+    state.depth, state.fanout, state.budget = None, None, None
+    with patch.object(
+        PythonParser, "parse_method_calls", return_value={"a", "b"}
+    ):
+        fault_line(state)
+    state.classifier.submit.assert_called_once()
+    assert len(state.classifications) == 1
+
+
+def test_index_repository_full():
+    state, parser = MagicMock(), MagicMock()
+    parser.commit = None
+    state.processor.head.return_value = "head"
+    index_repository(state, parser, "py")
+    parser.index.assert_called_once_with(
+        state.processor["py", "head"], "head"
+    )
+    parser.update.assert_not_called()
+
+
+def test_index_repository_unchanged():
+    state, parser = MagicMock(), MagicMock()
+    parser.commit = "head"
+    state.processor.head.return_value = "head"
+    index_repository(state, parser, "py")
+    parser.index.assert_not_called()
+    parser.update.assert_not_called()
+
+
+def test_index_repository_incremental():
+    state, parser = MagicMock(), MagicMock()
+    parser.commit = "base"
+    state.processor.head.return_value = "head"
+    state.processor.diff.return_value = (["changed"], ["removed"])
+    index_repository(state, parser, "py")
+    state.processor.diff.assert_called_once_with("base", "head", "py")
+    parser.update.assert_called_once_with(["changed"], ["removed"], "head")
+    parser.index.assert_not_called()
+
+
+def test_index_repository_diverged():
+    state, parser = MagicMock(), MagicMock()
+    parser.commit = "base"
+    state.processor.head.return_value = "head"
+    state.processor.diff.side_effect = LookupError
+    index_repository(state, parser, "py")
+    parser.index.assert_called_once_with(
+        state.processor["py", "head"], "head"
+    )
 
 
 def test_fault_line_no_endpoints(special_state):
@@ -141,13 +226,64 @@ def test_slow_code_one_method(state):
 
 def test_slow_code_multiple_methods(state):
     state.classifier = MagicMock()
-    state.classifier.return_value = None
+    state.classifications = []
     res1 = MagicMock()
     res2 = MagicMock()
     state.fault_line = [res1, res2]
     slow_code(state)
-    state.classifier.assert_called()
-    state.classifier.assert_has_calls([call(res1, res2)], any_order=True)
+    state.classifier.submit.assert_called_once_with(res1, res2)
+    state.classifier.report.assert_called_once()
+
+
+def test_slow_code_submitted_classifications(state):
+    res1, res2, res3 = MagicMock(), MagicMock(), MagicMock()
+    first, second = MagicMock(), MagicMock()
+    first.result.return_value = [res1]
+    second.result.return_value = [res3]
+    state.fault_line = [res1, res2, res3]
+    state.classifications = [first, second]
+    slow_code(state)
+    assert state.slow_code_blocks == [res1, res3]
+    state.classifier.submit.assert_not_called()
+
+
+def test_slow_code_top_k(state):
+    res1, res2, res3 = (
+        MagicMock(probability=0.6),
+        MagicMock(probability=0.9),
+        MagicMock(probability=0.7)
+    )
+    classification = MagicMock()
+    classification.result.return_value = [res1, res2, res3]
+    state.fault_line = [res1, res2, res3]
+    state.classifications = [classification]
+    state.top_k, state.confidence = 2, 0.65
+    slow_code(state)
+    assert state.slow_code_blocks == [res2, res3]
+
+
+def test_slow_code_localise(state):
+    block = MagicMock(probability=0.9)
+    classification = MagicMock()
+    classification.result.return_value = [block]
+    state.fault_line = [block, MagicMock()]
+    state.classifications = [classification]
+    state.region_share = 0.5
+    state.classifier.localise.return_value = (4, 10)
+    slow_code(state)
+    state.classifier.localise.assert_called_once_with(block, 0.5)
+    assert block.region == (4, 10)
+    state.region_share = None
+    slow_code(state)
+    state.classifier.localise.assert_called_once()
+
+
+def test_slow_code_single_method_not_localised(state):
+    state.fault_line = [MagicMock()]
+    state.region_share = 0.5
+    slow_code(state)
+    state.classifier.localise.assert_not_called()
+    state.classifier.submit.assert_not_called()
 
 
 def test_generate_code(state, py_file_node):
@@ -163,6 +299,26 @@ def test_generate_code(state, py_file_node):
         assert block.generated_code == "Test code"
 
 
+def test_generate_code_region(state, py_file_node):
+    PythonParser().parse_file_methods(py_file_node)
+    login = py_file_node.get("login")[0]
+    start = login.method.index("if user")
+    end = login.method.index("\n        return")
+    login.region = (start, end)
+    state.slow_code_blocks = [login]
+    state.generator.max_runs = 1
+    state.generator.generate_region.return_value = "fetchDetails()"
+    state.generator.validate.return_value = True
+    generate_code(state)
+    state.generator.generate.assert_not_called()
+    code, context, _ = state.generator.generate_region.call_args.args
+    assert code.startswith("if user") and code.endswith("signUP()")
+    assert context == '@app.route("/login")\n    def login(user):'
+    assert login.generated_code == (
+        login.method[:start] + "fetchDetails()" + login.method[end:]
+    )
+
+
 def test_generate_code_model_invalid(state, py_file_node):
     PythonParser().parse_file_methods(py_file_node)
     state.slow_code_blocks = py_file_node.methods.values()
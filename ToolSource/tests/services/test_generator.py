@@ -126,6 +126,26 @@ def test_generate(generator,  model_response):
             mock.assert_called_once_with("Test response")
 
 
+def test_generate_region(generator, model_response):
+    with patch.object(Generator, "_send", return_value=model_response) as mock:
+        with patch.object(
+            Generator, "_replace", return_value="Test response"
+        ) as mock_replace:
+            generator.generate_region("pass", "def res():", "Python")
+            mock.assert_called_once_with("Test response")
+            assert mock_replace.call_args.args[1]["$CONTEXT$"] == "def res():"
+
+
+def test_splice():
+    code = "def res(xs):\n    for x in xs:\n        pass\n    return xs"
+    start = code.index("for")
+    end = code.index("\n    return")
+    assert Generator.splice(code, (start, end), "\n  xs.sort()\n") == (
+        "def res(xs):\n    xs.sort()\n    return xs"
+    )
+    assert Generator.splice(code, (start, end), "  ") == ""
+
+
 def test_describe(generator, model_response):
     with patch.object(Generator, "_send", return_value=model_response) as mock:
         with patch.object(Generator, "_replace", return_value="Test response"):
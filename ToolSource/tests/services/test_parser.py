@@ -2,6 +2,22 @@ from aioptim.services.parser import PythonParser, JavaParser
 import pytest
 from unittest.mock import patch, MagicMock
 from aioptim.utils.node import Node
+import base64
+
+
+def file_node(path, raw_code):
+    base = MagicMock()
+    base.path = path
+    base.content = base64.b64encode(raw_code.encode())
+    return Node.FileNode(base)
+
+
+def visible(file):
+    return {
+        method
+        for linked in [file, *file.links]
+        for method in linked.methods.values()
+    }
 
 
 @pytest.fixture
@@ -112,102 +128,41 @@ def java_ex2_raw_code():
 
 @pytest.fixture
 def py_file_node(py_raw_code):
-    file = MagicMock()
-    file.raw_code = py_raw_code
-    file.methods = {}
-    file.base.path = "src/aioptim/module"
-    file.extend = lambda new_methods: file.methods.update(new_methods)
-    return file
+    return file_node("src/aioptim/module", py_raw_code)
 
 
 @pytest.fixture
 def java_file_node(java_raw_code):
-    file = MagicMock()
-    file.raw_code = java_raw_code
-    file.methods = {}
-    file.base.path = "util/newAPP"
-    file.extend = lambda new_methods: file.methods.update(new_methods)
-    return file
+    return file_node("util/newAPP", java_raw_code)
 
 @pytest.fixture
 def py_ex_file_node(py_ex_raw_code):
-    file = MagicMock()
-    file.raw_code = py_ex_raw_code
-    file.methods = {}
-    file.base.path = "src/aioptim/module/main1"
-    file.extend = lambda new_methods: file.methods.update(new_methods)
-    return file
+    return file_node("src/aioptim/module/main1", py_ex_raw_code)
 
 
 @pytest.fixture
 def java_ex_file_node(java_ex_raw_code):
-    file = MagicMock()
-    file.raw_code = java_ex_raw_code
-    file.methods = {}
-    file.base.path = "src/aioptim/module/main2"
-    file.extend = lambda new_methods: file.methods.update(new_methods)
-    return file
+    return file_node("src/aioptim/module/main2", java_ex_raw_code)
 
 @pytest.fixture
 def java_ex2_file_node(java_ex2_raw_code):
-    file = MagicMock()
-    file.raw_code = java_ex2_raw_code
-    file.methods = {}
-    file.base.path = "src/aioptim/module/main3"
-    file.extend = lambda new_methods: file.methods.update(new_methods)
-    return file
+    return file_node("src/aioptim/module/main3", java_ex2_raw_code)
 
 @pytest.fixture
 def empty_file_node():
-    file = MagicMock()
-    file.raw_code = """"""
-    file.methods = {}
-    file.base.path = None
-    file.extend = lambda new_methods: file.methods.update(new_methods)
-    return file
+    return file_node("", """""")
 
 
 @pytest.fixture
 def python_method(py_file_node):
-    code = """
-     @app.route("/login")
-     def login(user):
-        authentateUser()
-        if user:
-            fetchDetails()
-        else:
-            signUP()
-        return "User is logged in"
-    """
-    return Node.FileNode.MethodNode(
-        py_file_node,
-        "login",
-        "user",
-        code,
-        "/login"
-    )
+    PythonParser().parse_file_methods(py_file_node)
+    return py_file_node.get("login")[0]
 
 
 @pytest.fixture
 def java_method(java_file_node):
-    code = """
-    @GetMapping("/login")
-    public String login(User user){
-        boolean isAuthenticated = Authenticate(user);
-        if (isAuthenticated){
-            return fetchDetails();
-        } else {
-            return signUp();
-        }
-    }
-    """
-    return Node.FileNode.MethodNode(
-        java_file_node,
-        "login",
-        "user",
-        code,
-        "/login"
-    )
+    JavaParser().parse_file_methods(java_file_node)
+    return java_file_node.get("login")[0]
 
 
 def test_parse_file_methods(py_file_node, java_file_node):
@@ -249,6 +204,171 @@ def test_parse_method_calls(
     java_result_id = set(res.id for res in java_result)
     assert java_result_id == {'login', 'signUp', 'fetchDetails'}
 
+def test_extract_call_sites(py_file_node):
+    parser = PythonParser()
+    parser.parse_file_methods(py_file_node)
+    assert py_file_node.get("login")[0].calls == (
+        "authentateUser", "fetchDetails", "signUP"
+    )
+    assert py_file_node.get("signUP")[0].calls == ("signUpContent",)
+
+
+def test_decorator_calls_excluded():
+    node = file_node(
+        "src/aioptim/routes.py",
+        '@router.delete("/items/{id}")\ndef remove(id):\n    return id\n'
+    )
+    PythonParser().parse_file_methods(node)
+    method = node.get("remove")[0]
+    assert method.calls == ()
+    assert method.profile.io_calls == 0
+
+
+def test_parse_method_calls_without_reparsing(py_file_node, python_method):
+    parser = PythonParser()
+    parser.parse_file_methods(py_file_node)
+    parser.parser = MagicMock()
+    result = parser.parse_method_calls(python_method)
+    assert {method.id for method in result} == {'login', 'signUP'}
+    parser.parser.parse.assert_not_called()
+
+
+@pytest.fixture
+def hot_file_node():
+    return file_node("src/aioptim/hot.py", """
+def root():
+    cold()
+    hot()
+
+def cold():
+    leaf()
+
+def hot():
+    for x in xs:
+        for y in ys:
+            leaf()
+    requests.get(x)
+
+def leaf():
+    return 1
+""")
+
+
+def test_extract_profile(hot_file_node):
+    PythonParser().parse_file_methods(hot_file_node)
+    hot = hot_file_node.get("hot")[0]
+    assert hot.profile == (2, 1, 1, 4, False, 0)
+    assert hot.hotness > hot_file_node.get("cold")[0].hotness
+
+
+def test_extract_profile_recursion_and_collections():
+    node = file_node("src/aioptim/shapes.py", """
+def fact(n):
+    if n < 2:
+        return 1
+    return n * fact(n - 1)
+
+def unique(xs):
+    out = []
+    for x in xs:
+        out.append(x)
+    return out
+""")
+    PythonParser().parse_file_methods(node)
+    fact = node.get("fact")[0].profile
+    unique = node.get("unique")[0].profile
+    assert fact.recursive and fact.statements == 3
+    assert not unique.recursive and unique.loop_collections == 1
+
+
+def test_extract_statement_boundaries(hot_file_node):
+    PythonParser().parse_file_methods(hot_file_node)
+    hot = hot_file_node.get("hot")[0]
+    assert [
+        (hot.method[offset:].split("(")[0].split()[0], depth)
+        for offset, depth in hot.boundaries
+    ] == [("for", 0), ("for", 1), ("leaf", 2), ("requests.get", 0)]
+
+
+@pytest.mark.parametrize("limits, expected", [
+    ({}, {"root", "cold", "hot", "leaf"}),
+    ({"depth": 1}, {"root", "cold", "hot"}),
+    ({"fanout": 1}, {"root", "hot", "leaf"}),
+    ({"budget": 2}, {"root", "hot"}),
+])
+def test_parse_method_calls_limits(hot_file_node, limits, expected):
+    parser = PythonParser()
+    parser.parse_file_methods(hot_file_node)
+    result = parser.parse_method_calls(hot_file_node.get("root")[0], **limits)
+    assert {method.id for method in result} == expected
+
+
+@pytest.fixture
+def cyclic_file_node():
+    return file_node("src/aioptim/cyclic.py", """
+def first():
+    ping()
+
+def second():
+    pong()
+
+def ping():
+    pong()
+
+def pong():
+    ping()
+    leaf()
+
+def leaf():
+    return 1
+""")
+
+
+def test_parse_method_calls_cycles(cyclic_file_node):
+    parser = PythonParser()
+    parser.parse_file_methods(cyclic_file_node)
+    first = parser.parse_method_calls(cyclic_file_node.get("first")[0])
+    second = parser.parse_method_calls(cyclic_file_node.get("second")[0])
+    assert {method.id for method in first} == {
+        "first", "ping", "pong", "leaf"
+    }
+    assert {method.id for method in second} == {
+        "second", "ping", "pong", "leaf"
+    }
+    ping = cyclic_file_node.get("ping")[0].symbol
+    pong = cyclic_file_node.get("pong")[0].symbol
+    assert parser.graph.reachable[ping] is parser.graph.reachable[pong]
+
+
+def test_parse_method_calls_memoised(cyclic_file_node):
+    parser = PythonParser()
+    parser.parse_file_methods(cyclic_file_node)
+    with patch.object(
+        Node.FileNode, "resolve", autospec=True,
+        side_effect=Node.FileNode.resolve
+    ) as mock_resolve:
+        parser.parse_method_calls(cyclic_file_node.get("first")[0])
+        resolved = mock_resolve.call_count
+        parser.parse_method_calls(cyclic_file_node.get("second")[0])
+        assert mock_resolve.call_count == resolved + 1
+
+
+def test_parse_method_calls_invalidated(cyclic_file_node):
+    parser = PythonParser()
+    parser.index([cyclic_file_node], "base")
+    parser.parse_method_calls(cyclic_file_node.get("first")[0])
+    modified = file_node("src/aioptim/cyclic.py", """
+def first():
+    leaf()
+
+def leaf():
+    return 1
+""")
+    parser.update([modified], [], "head")
+    result = parser.parse_method_calls(modified.get("first")[0])
+    assert {method.id for method in result} == {"first", "leaf"}
+
+
 def test_parse_empty_method_calls():
     assert not JavaParser().parse_method_calls(None)
     assert not PythonParser().parse_method_calls(None)
@@ -273,7 +393,8 @@ def test_python_extend_file_methods(py_file_node, py_ex_file_node):
     PythonParser().parse_file_methods(py_ex_file_node)
     PythonParser().parse_file_methods(py_file_node)
     PythonParser().extend_file_methods([py_file_node, py_ex_file_node])
-    assert len(py_ex_file_node.methods) == 5
+    assert py_ex_file_node.links == [py_file_node]
+    assert len(visible(py_ex_file_node)) == 5
 
 
 def test_java_extend_file_methods(
@@ -287,5 +408,233 @@ def test_java_extend_file_methods(
     JavaParser().extend_file_methods(
         [java_ex_file_node, java_ex2_file_node, java_file_node]
     )
-    assert len(java_ex2_file_node.methods) == 5
-    assert len(java_ex_file_node.methods) == 5
+    assert len(visible(java_ex2_file_node)) == 5
+    assert len(visible(java_ex_file_node)) == 5
+    assert len(java_ex_file_node.methods) == 1
+
+
+def test_java_extend_file_methods_qualified_names(
+        java_file_node,
+        java_ex_raw_code
+):
+    java_ex_file_node = file_node(
+        "src/aioptim/module/main2",
+        java_ex_raw_code.replace(
+            "import util.newAPP;",
+            "import com.utils.*;\n    import util.newAPPHelper;"
+        )
+    )
+    JavaParser().parse_file_methods(java_file_node)
+    JavaParser().parse_file_methods(java_ex_file_node)
+    JavaParser().extend_file_methods([java_ex_file_node, java_file_node])
+    assert len(visible(java_ex_file_node)) == 5
+    assert len(visible(java_file_node)) == 4
+
+
+def test_python_extend_file_methods_relative_imports(
+        py_file_node,
+        py_ex_raw_code
+):
+    py_file_node.base.path = "src/aioptim/module/__init__.py"
+    py_ex_file_node = file_node(
+        "src/aioptim/module/main1.py",
+        py_ex_raw_code.replace(
+            "import src.aioptim.module", "from . import login"
+        )
+    )
+    PythonParser().parse_file_methods(py_ex_file_node)
+    PythonParser().parse_file_methods(py_file_node)
+    PythonParser().extend_file_methods([py_file_node, py_ex_file_node])
+    assert len(visible(py_ex_file_node)) == 5
+    assert len(visible(py_file_node)) == 4
+
+
+def test_python_extend_file_methods_no_partial_match(
+        py_file_node,
+        py_ex_file_node
+):
+    py_file_node.base.path = "src/aioptim/module_extra.py"
+    PythonParser().parse_file_methods(py_ex_file_node)
+    PythonParser().parse_file_methods(py_file_node)
+    PythonParser().extend_file_methods([py_file_node, py_ex_file_node])
+    assert len(visible(py_ex_file_node)) == 1
+
+
+def test_parse_files_in_parallel(java_file_node, java_ex_file_node):
+    with patch("aioptim.services.parser.BaseParser.PARALLEL_MIN", 1):
+        JavaParser().parse_files([java_file_node, java_ex_file_node], workers=2)
+    assert {method.id for method in java_file_node.methods.values()} == {
+        "login", "fetchDetails", "signUp", "getFile"
+    }
+    assert java_file_node.get("login")[0].decorator == '("/login")'
+    assert java_file_node.package == "com.utils"
+    assert java_ex_file_node.imports == ["util.newAPP"]
+
+
+def test_update_index(py_file_node, py_ex_file_node):
+    parser = PythonParser()
+    py_ex_file_node.base.path = "src/aioptim/module/main1.py"
+    parser.index([py_ex_file_node], "base")
+    assert len(visible(py_ex_file_node)) == 1
+
+    parser.update([py_file_node], [], "head")
+    assert parser.commit == "head"
+    assert len(visible(py_ex_file_node)) == 5
+    assert parser.dependents["src/aioptim/module"] == {
+        "src/aioptim/module/main1.py"
+    }
+
+    modified = file_node(
+        "src/aioptim/module", "def login(user):\n    return user\n"
+    )
+    parser.update([modified], [], "next")
+    assert len(visible(py_ex_file_node)) == 2
+
+    parser.update([], ["src/aioptim/module"], "last")
+    assert len(visible(py_ex_file_node)) == 1
+    assert set(parser.files) == {"src/aioptim/module/main1.py"}
+    assert not parser.dependents
+
+
+@pytest.fixture
+def java_routes_file_node():
+    return file_node("src/UserController.java", """
+    @RestController
+    @RequestMapping("/api")
+    public class UserController {
+        @GetMapping("/user/{id}")
+        public User getUser(String id){
+            return find(id);
+        }
+
+        @GetMapping(path = "/user/me")
+        public User me(){
+            return find(current());
+        }
+
+        @RequestMapping(value = {"/user/{id}"}, method = RequestMethod.DELETE)
+        public void deleteUser(String id){
+            delete(id);
+        }
+    }
+    """)
+
+
+@pytest.fixture
+def py_routes_file_node():
+    return file_node("src/items.py", """
+    router = APIRouter(prefix="/items")
+
+    @router.get("/{item_id}")
+    def read_item(item_id):
+        return find(item_id)
+
+    @app.route("/items/<int:item_id>", methods=["PUT", "POST"])
+    def update_item(item_id):
+        return save(item_id)
+    """)
+
+
+def test_java_route_endpoint_location(java_routes_file_node):
+    parser = JavaParser()
+    parser.parse_file_methods(java_routes_file_node)
+    files = [java_routes_file_node]
+    assert parser.endpoint(files, "GET /api/user/42").id == "getUser"
+    assert parser.endpoint(files, "GET /api/user/{id}").id == "getUser"
+    assert parser.endpoint(files, "GET /api/user/me").id == "me"
+    assert parser.endpoint(files, "DELETE /api/user/me").id == "deleteUser"
+
+
+def test_python_route_endpoint_location(py_routes_file_node):
+    parser = PythonParser()
+    parser.parse_file_methods(py_routes_file_node)
+    files = [py_routes_file_node]
+    assert parser.endpoint(files, "GET /items/7").id == "read_item"
+    assert parser.endpoint(files, "POST /items/{id}").id == "update_item"
+    assert parser.endpoint(files, "/items/7?full=true").id == "read_item"
+
+
+def test_overloaded_route_handlers():
+    file = file_node("src/SearchController.java", """
+    @RestController
+    @RequestMapping("/api")
+    public class SearchController {
+        @GetMapping("/all")
+        public List<Item> find(){
+            return all();
+        }
+
+        @GetMapping("/search")
+        public List<Item> find(String q){
+            return search(q);
+        }
+    }
+    """)
+    parser = JavaParser()
+    parser.parse_file_methods(file)
+    assert parser.endpoint([file], "GET /api/all").params == "()"
+    assert parser.endpoint([file], "GET /api/search").params == "(String q)"
+
+
+def test_same_named_route_handlers():
+    file = file_node("src/views.py", """
+    class Users:
+        @app.get("/users")
+        def list(self):
+            return users()
+
+    class Items:
+        @app.get("/items")
+        def list(self):
+            return items()
+    """)
+    parser = PythonParser()
+    parser.parse_file_methods(file)
+    assert parser.endpoint([file], "GET /users").cls == "Users"
+    assert parser.endpoint([file], "GET /items").cls == "Items"
+
+
+def test_indexed_route_table(py_routes_file_node):
+    parser = PythonParser()
+    parser.index([py_routes_file_node], "base")
+    assert parser.endpoint([], "GET /items/7").id == "read_item"
+    parser.update([], [py_routes_file_node.base.path], "head")
+    assert parser.endpoint([], "GET /items/7") is None
+
+
+def test_same_named_methods_in_different_classes():
+    file = file_node("src/Shapes.java", """
+    public class Square{
+        public int area(int side){
+            return side * side;
+        }
+    }
+
+    class Circle{
+        public int area(int side){
+            return 3 * side * side;
+        }
+    }
+    """)
+    JavaParser().parse_file_methods(file)
+    assert len(file.methods) == 2
+    assert {method.cls for method in file.get("area")} == {"Square", "Circle"}
+
+
+def test_parse_method_calls_prefers_own_methods(py_file_node, py_ex_raw_code):
+    parser = PythonParser()
+    py_ex_file_node = file_node("src/aioptim/module/main1", py_ex_raw_code + """
+    def signUP():
+        return extraMethod()
+
+    def caller():
+        signUP()
+    """)
+    parser.parse_files([py_file_node, py_ex_file_node])
+    parser.extend_file_methods([py_file_node, py_ex_file_node])
+    result = parser.parse_method_calls(py_ex_file_node.get("caller")[0])
+    assert {(method.parent, method.id) for method in result} == {
+        (py_ex_file_node, "caller"),
+        (py_ex_file_node, "signUP"),
+        (py_ex_file_node, "extraMethod")
+    }
@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import MagicMock, patch
 from aioptim.services.processor import GithubProcessor
 import base64
-from github import Github, Auth
+from github import Github, Auth, UnknownObjectException
 
 
 @pytest.fixture
@@ -107,6 +107,13 @@ def test_get_item_not_exist(processor):
     assert len(processor['']) == 0
 
 
+def test_get_item_at_commit(processor):
+    repository = processor.github.get_repo.return_value
+    assert len(processor['py', 'head']) == 5
+    calls = repository.get_contents.call_args_list
+    assert {call.kwargs.get('ref') for call in calls} == {'head'}
+
+
 def test_update_file_no_code(processor, method_node):
     code = """
         def test(x):
@@ -124,3 +131,60 @@ def test_update_file_no_code(processor, method_node):
 
 def test_update_file_with_code(processor):
     assert processor.update_file(None, "") is None
+
+
+def test_head(processor):
+    assert processor.head() == 1
+
+
+def test_diff(processor):
+    repository = processor.github.get_repo()
+    comparison = MagicMock()
+    comparison.status = "ahead"
+    statuses = [
+        ("added", "new.py", None),
+        ("modified", "changed.py", None),
+        ("removed", "deleted.py", None),
+        ("renamed", "renamed.py", "original.py"),
+        ("modified", "ignored.java", None)
+    ]
+    comparison.files = []
+    for status, filename, previous_filename in statuses:
+        file = MagicMock()
+        file.status = status
+        file.filename = filename
+        file.previous_filename = previous_filename
+        comparison.files.append(file)
+    repository.compare.return_value = comparison
+    repository.get_contents.side_effect = lambda path, ref: MagicMock(
+        path=path, content=base64.b64encode("pass".encode())
+    )
+    changed, removed = processor.diff("base", "head", "py")
+    assert [file.base.path for file in changed] == [
+        "new.py", "changed.py", "renamed.py"
+    ]
+    assert removed == ["deleted.py", "original.py"]
+
+
+def test_diff_diverged(processor):
+    repository = processor.github.get_repo()
+    repository.compare.return_value.status = "diverged"
+    with pytest.raises(LookupError):
+        processor.diff("base", "head", "py")
+
+
+def test_diff_missing_base(processor):
+    repository = processor.github.get_repo()
+    repository.compare.side_effect = UnknownObjectException(404)
+    with pytest.raises(LookupError):
+        processor.diff("base", "head", "py")
+
+
+def test_diff_truncated(processor):
+    repository = processor.github.get_repo()
+    repository.compare.return_value.status = "ahead"
+    repository.compare.return_value.files = [
+        MagicMock()
+    ] * GithubProcessor.COMPARE_FILES
+    with pytest.raises(LookupError):
+        processor.diff("base", "head", "py")
@@ -0,0 +1,107 @@
+from aioptim.services.classifier import Classifier
+from aioptim.services.workers import ClassifierPool, _cores
+from tokenizers import ByteLevelBPETokenizer
+from transformers import RobertaTokenizerFast
+from types import SimpleNamespace
+import pytest
+
+CODE = "def find(items, key):\n    for item in items:\n        print(item)\n"
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory, tiny_model):
+    path = tmp_path_factory.mktemp("snapshot")
+    tokenizer = ByteLevelBPETokenizer()
+    tokenizer.train_from_iterator(
+        [CODE] * 10,
+        vocab_size=300,
+        special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"]
+    )
+    tokenizer.save_model(str(path))
+    tokenizer = RobertaTokenizerFast(
+        str(path / "vocab.json"), str(path / "merges.txt")
+    )
+    tokenizer.save_pretrained(str(path))
+    tiny_model(len(tokenizer)).save_pretrained(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def methods():
+    return [
+        SimpleNamespace(method=CODE * (index + 1)) for index in range(6)
+    ]
+
+
+def test_pool_matches_in_process(snapshot, methods):
+    expected = Classifier(snapshot=snapshot).classify(methods)
+    classifier = Classifier(snapshot=snapshot, workers=1)
+    try:
+        assert classifier.classify(methods) == expected
+        futures = [
+            classifier.pool.submit(methods[i:i+2]) for i in range(0, 6, 2)
+        ]
+        assert [
+            verdict for future in futures for verdict in future.result()
+        ] == expected
+        report = classifier.report()
+        assert "pool_start_seconds" in report
+        assert {"load_seconds", "warmup_seconds", "tokens"} <= set(report)
+        assert 0 < report["padding_efficiency"] <= 1
+    finally:
+        classifier.pool.close()
+
+
+def test_merge():
+    report = {}
+    for worker in ({"threads": 1, "load_seconds": 1.5, "tokens": 10},
+                   {"threads": 1, "load_seconds": 2.0, "tokens": 5}):
+        ClassifierPool.merge(report, worker)
+    assert report == {"threads": 1, "load_seconds": 2.0, "tokens": 15}
+
+
+def test_pool_localises(snapshot):
+    method = SimpleNamespace(
+        method=CODE,
+        language="py",
+        boundaries=((26, 1), (53, 2)),
+        regions=((26, 65, 1), (53, 65, 2))
+    )
+    expected = Classifier(snapshot=snapshot).localise(method, 0.3)
+    classifier = Classifier(snapshot=snapshot, workers=1)
+    try:
+        assert classifier.localise(method, 0.3) == expected
+        assert classifier._model is None
+    finally:
+        classifier.pool.close()
+
+
+def test_pool_fails_when_a_worker_stops(snapshot, methods):
+    classifier = Classifier(snapshot=snapshot, workers=1)
+    classifier.classify(methods)
+    pool = classifier.pool
+    pool.processes[0].kill()
+    pool.processes[0].join()
+    with pytest.raises(RuntimeError):
+        pool.submit(methods).result(timeout=30)
+    assert pool.broken
+    try:
+        assert classifier.classify(methods)
+        assert classifier.pool is not pool
+    finally:
+        classifier.pool.close()
+
+
+def test_submit(snapshot, methods):
+    classifier = Classifier(snapshot=snapshot)
+    assert classifier.submit(*methods).result() == classifier(*methods)
+
+
+@pytest.mark.parametrize("affinity, worker, expected", [
+    (None, 0, None),
+    ((0, 1, 2, 3), 0, (0, 2)),
+    ((0, 1, 2, 3), 1, (1, 3)),
+    ((0,), 1, (0,)),
+])
+def test_cores(affinity, worker, expected):
+    assert _cores(affinity, worker, 2) == expected
@@ -0,0 +1,47 @@
+from aioptim.utils.cache import ClassificationCache
+import pytest
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ClassificationCache(str(tmp_path / "classifier.db"))
+
+
+def test_digest_ignores_whitespace():
+    assert ClassificationCache.digest(
+        "def login(user):\n    return user"
+    ) == ClassificationCache.digest("def login(user):\n\treturn  user\n")
+    assert ClassificationCache.digest(
+        "def login(user): return user"
+    ) != ClassificationCache.digest("def login(user): return None")
+
+
+def test_get_missing(cache):
+    assert cache.get(["missing"], "model", "1") == {}
+
+
+def test_put_get(cache):
+    cache.put({"a": (1, 1.0), "b": (0, 0.0)}, "model", "1")
+    assert cache.get(["a", "b", "c"], "model", "1") == {
+        "a": (1, 1.0), "b": (0, 0.0)
+    }
+
+
+def test_persists(tmp_path, cache):
+    cache.put({"a": (1, 0.5)}, "model", "1")
+    reopened = ClassificationCache(str(tmp_path / "classifier.db"))
+    assert reopened.get(["a"], "model", "1") == {"a": (1, 0.5)}
+
+
+def test_model_change_invalidates(cache):
+    cache.put({"a": (1, 1.0)}, "model", "1")
+    assert cache.get(["a"], "model", "2") == {}
+    cache.put({"b": (0, 0.0)}, "model", "2")
+    assert cache.get(["a"], "model", "1") == {}
+    assert cache.get(["b"], "model", "2") == {"b": (0, 0.0)}
+
+
+def test_default_path():
+    assert ClassificationCache.get_abs_path().endswith(
+        "config/classifier.db"
+    )
@@ -107,6 +107,7 @@ def test_Prompt_validation():
     with patch.object(Prompt, "file_exists", return_value=True):
         with patch.object(Prompt, "get_contents", return_value={
             'code_generation': "",
+            'region_generation': "",
             'codejudge_analyse': "",
             'codejudge_summarise': "",
             'description_generation': ""
@@ -118,6 +119,7 @@ def test_Prompt_validation():
     with patch.object(Prompt, "file_exists", return_value=True):
         with patch.object(Prompt, "get_contents", return_value={
             'code_generation': "test",
+            'region_generation': "test",
             'codejudge_analyse': "test",
             'codejudge_summarise': "test",
             'description_generation': "test"
@@ -202,6 +204,7 @@ def test_ConfigKeys_get_keys():
 def test_PromptKeys_get_keys():
     assert Prompt.PromptKeys.get_keys() == {
         'code_generation',
+        'region_generation',
         'codejudge_analyse',
         'codejudge_summarise',
         'description_generation'
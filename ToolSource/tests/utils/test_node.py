@@ -4,11 +4,22 @@ import pytest
 import base64
 
 
+CODE = (
+    "def test_function(x): /n/t return None\n"
+    "def different_test_function(y): /n/t return None\n"
+)
+
+
+def span(code, text):
+    start = code.encode().index(text.encode())
+    return start, start + len(text.encode())
+
+
 @pytest.fixture
 def file_node():
     base_file = MagicMock()
     base_file.path = "test/test.py"
-    base_file.content = base64.b64encode("test".encode())
+    base_file.content = base64.b64encode(CODE.encode())
     return Node.FileNode(
         base_file
     )
@@ -19,8 +30,8 @@ def method_node(file_node):
     return Node.FileNode.MethodNode(
         file_node,
         "test_function",
-        "x",
-        "def test_function(x): /n/t return None",
+        span(CODE, "x"),
+        span(CODE, "def test_function(x): /n/t return None"),
         None
     )
 
@@ -30,8 +41,8 @@ def method_node_polymorphic(file_node):
     return Node.FileNode.MethodNode(
         file_node,
         "test_function",
-        "x",
-        "def test_function(x): /n/t return 5",
+        span(CODE, "x"),
+        span(CODE, "def test_function(x):"),
         None
     )
 
@@ -41,30 +52,147 @@ def diff_method_node(file_node):
     return Node.FileNode.MethodNode(
         file_node,
         "different_test_function",
-        "y",
-        "def different_test_function(y): /n/t return None",
+        span(CODE, "y"),
+        span(CODE, "def different_test_function(y): /n/t return None"),
         None
     )
 
 
+@pytest.fixture
+def other_file_node():
+    base_file = MagicMock()
+    base_file.path = "test/other.py"
+    base_file.content = base64.b64encode("other".encode())
+    return Node.FileNode(
+        base_file
+    )
+
+
 def test_method_node_hash(method_node):
-    assert hash((method_node.id, method_node.params)) == hash(method_node)
+    assert hash(method_node.symbol) == hash(method_node)
+    assert Node.SYMBOLS[method_node.symbol] == (
+        "test/test.py", None, "test_function", "x"
+    )
 
 
 def test_method_node_eq(method_node, method_node_polymorphic, diff_method_node):
     assert method_node == method_node_polymorphic
+    assert method_node.symbol == method_node_polymorphic.symbol
     assert method_node != diff_method_node
 
 
-def test_file_node_extend_with_methods(file_node, method_node, diff_method_node):
-    data = {
-        method_node.id: method_node,
-        diff_method_node.id: diff_method_node
-    }
-    file_node.extend(data)
+def test_method_node_qualified(file_node, other_file_node, method_node):
+    in_class = Node.FileNode.MethodNode(
+        file_node, "test_function", span(CODE, "x"), (0, len(CODE)),
+        cls="Test"
+    )
+    in_other_file = Node.FileNode.MethodNode(
+        other_file_node, "test_function", span(CODE, "x"), (0, 5)
+    )
+    assert method_node != in_class
+    assert method_node != in_other_file
+    assert len({method_node, in_class, in_other_file}) == 3
+
+
+def test_file_node_add(file_node, method_node, method_node_polymorphic,
+                       diff_method_node):
+    file_node.add(method_node)
+    file_node.add(method_node_polymorphic)
+    file_node.add(diff_method_node)
     assert len(file_node.methods) == 2
+    assert file_node.get("test_function") == [method_node_polymorphic]
+    assert file_node.get("missing") == []
+
+
+def test_file_node_extend_with_methods(file_node, other_file_node,
+                                       method_node, diff_method_node):
+    other_file_node.add(diff_method_node)
+    file_node.add(method_node)
+    file_node.extend(other_file_node)
+    file_node.extend(other_file_node)
+    assert file_node.links == [other_file_node]
+    assert len(file_node.methods) == 1
+    assert file_node.resolve("different_test_function") == [diff_method_node]
+    assert file_node.resolve("test_function") == [method_node]
 
 
 def test_file_node_extend_without_methods(file_node):
-    file_node.extend({})
+    file_node.extend(file_node)
     assert not file_node.methods
+    assert not file_node.links
+
+
+def test_file_node_clear(file_node, other_file_node, method_node):
+    file_node.add(method_node)
+    file_node.extend(other_file_node)
+    file_node.clear()
+    assert not file_node.methods
+    assert not file_node.links
+    assert file_node.get("test_function") == []
+
+
+def test_method_node_text(file_node, method_node):
+    assert method_node.method == "def test_function(x): /n/t return None"
+    assert method_node.params == "x"
+    assert method_node.decorator is None
+    assert file_node.raw_code == CODE
+
+
+def test_method_node_slots(method_node):
+    assert not hasattr(method_node, "__dict__")
+    method_node.generated_code = "def test_function(x): pass"
+    with pytest.raises(AttributeError):
+        method_node.unknown = True
+
+
+def test_method_node_boundaries():
+    code = "def greet():\n    print('héllo')\n    return 1\n"
+    base_file = MagicMock()
+    base_file.path = "test/greet.py"
+    base_file.content = base64.b64encode(code.encode())
+    file = Node.FileNode(base_file)
+    method = Node.FileNode.MethodNode(
+        file,
+        "greet",
+        span(code, "()"),
+        span(code, code.rstrip()),
+        statements=(
+            (*span(code, "print('héllo')"), 0),
+            (*span(code, "return 1"), 0)
+        )
+    )
+    assert method.boundaries == (
+        (code.index("print"), 0), (code.index("return"), 0)
+    )
+    start, end = method.regions[0][:2]
+    assert method.method[start:end] == "print('héllo')"
+
+
+def test_method_node_context(file_node):
+    code = (
+        "def scan(xs):\n"
+        "    for x in xs:\n"
+        "        if x:\n"
+        "            print(x)\n"
+        "    return xs\n"
+    )
+    base_file = MagicMock()
+    base_file.path = "test/scan.py"
+    base_file.content = base64.b64encode(code.encode())
+    method = Node.FileNode.MethodNode(
+        Node.FileNode(base_file),
+        "scan",
+        span(code, "xs"),
+        span(code, code.rstrip()),
+        statements=(
+            (*span(code, code[code.index("for"):code.index("    return")]
+                   .rstrip()), 0),
+            (*span(code, "if x:\n            print(x)"), 1),
+            (*span(code, "print(x)"), 2),
+            (*span(code, "return xs"), 0)
+        )
+    )
+    start = method.method.index("print")
+    assert method.context(start, start + len("print(x)")) == (
+        "def scan(xs):\n    for x in xs:\n        if x:"
+    )
@@ -0,0 +1,82 @@
+from aioptim.utils.normaliser import Normaliser
+import pytest
+
+PY_CODE = '''def total(items):
+    """
+    Sums the items.
+    """
+    # Accumulate   the sum
+
+    result  =  0   # running total
+    for item in items:
+        result += item
+    return result'''
+
+JAVA_CODE = '''/** Sums the items. */
+int total(int[] items) {
+    // Accumulate the sum
+    int result = 0; /* running total */
+    for (int item : items) { result += item; }
+    return result;
+}'''
+
+
+@pytest.fixture(scope="module")
+def normaliser():
+    return Normaliser()
+
+
+def test_normalise_python(normaliser):
+    assert normaliser.normalise(PY_CODE, "py").code == (
+        "def total(items):\n"
+        "    result = 0\n"
+        "    for item in items:\n"
+        "        result += item\n"
+        "    return result"
+    )
+
+
+def test_normalise_java(normaliser):
+    assert normaliser.normalise(JAVA_CODE, "java").code == (
+        "int total(int[] items) {\n"
+        "int result = 0;\n"
+        "for (int item : items) { result += item; }\n"
+        "return result;\n"
+        "}"
+    )
+
+
+def test_normalise_unsupported_language(normaliser):
+    assert normaliser.normalise("a  =  1 // one\n\n\nb", "js").code == (
+        "a = 1 // one\nb"
+    )
+
+
+@pytest.mark.parametrize("code, language", [
+    (PY_CODE, "py"), (JAVA_CODE, "java")
+])
+def test_normalised_position(normaliser, code, language):
+    normalised = normaliser.normalise(code, language)
+    for word in ("result", "for", "return"):
+        position = normalised.position(code.index(word))
+        assert normalised.code[position:].startswith(word)
+    assert normalised.position(0) == 0
+
+
+@pytest.mark.parametrize("code, language", [
+    (PY_CODE, "py"), (JAVA_CODE, "java")
+])
+def test_normalised_origin(normaliser, code, language):
+    normalised = normaliser.normalise(code, language)
+    for word in ("result", "for", "return"):
+        origin = normalised.origin(normalised.code.index(word))
+        assert code[origin:].startswith(word)
+    assert normalised.origin(0) == code.index(normalised.code.split()[0])
+
+
+def test_normalise_multibyte(normaliser):
+    code = 'def greet():\n    # héllo\n    return "héllo"  # wave\n'
+    normalised = normaliser.normalise(code, "py")
+    assert normalised.code == 'def greet():\n    return "héllo"'
+    position = normalised.position(code.index("return"))
+    assert normalised.code[position:].startswith("return")